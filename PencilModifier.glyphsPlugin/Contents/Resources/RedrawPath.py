@@ -8,13 +8,14 @@ Merges last added path with the nearest path into one continuous path with smoot
 
 import math
 from GlyphsApp import Glyphs, OFFCURVE, CURVE, LINE, GSNode
-from AppKit import NSPoint
+from SimplifyPath import inflected_handles_targets
 
 # --------------------------------------------------
 
 # CONSTANTS
 
 # Accuracy for finding closest path and its closest segments to merge
+# Curves are split into straight pieces until their handles deviate from a piece less than 1/4 of this value
 # Smaller value gives better accuracy but produces more computation
 # Greater value will improve performance but reduce accuracy.
 # Minimal recommended value is 5
@@ -36,6 +37,10 @@ CONNECTION_COLLAPSE_MAX_DISTANCE = 25
 # Smaller value provides sharper connection, greater value provides more smoothness
 CONNECTION_HANDLE_MIN_LENGTH = 20
 
+# Minimal length of connection handles shortened after they intersect each other
+# Minimum value should be 1 to avoid handle collapsing with its node
+CONNECTION_INFLECTION_MIN_LENGTH = 1
+
 # --------------------------------------------------
 
 # VARIABLES
@@ -59,6 +64,26 @@ CONNECTION_HANDLE_MIN_LENGTH = 20
 
 # --------------------------------------------------
 
+# CACHE
+
+# Segments of existing paths saved by the last closest area search
+# Keyed by path id, holds path geometry fingerprint, segments indexed from it, node types, segment topology and path bounding box
+# Existing paths rarely change between strokes, so their segments are reused while fingerprint matches
+segments_cache = {}
+
+# Clear saved segments
+def clear_segments_cache():
+	segments_cache.clear()
+
+# Geometry fingerprint of path saved by the last closest area search, or None if path isn't saved
+def cached_path_fingerprint(path):
+	cached = segments_cache.get(id(path))
+	if cached is None:
+		return None
+	return cached[0]
+
+# --------------------------------------------------
+
 
 
 # Identify connection nodes on new path
@@ -70,159 +95,341 @@ def identify_new_path_connection_nodes(path):
 
 
 
-# Find closest area on closest path and detect nodes for connection
-def identify_closest_area(paths, new_path, NS1, NE1):
-	# Compute bounding box of a cubic curve segment
-	def cubic_bezier_bbox(p0, p1, p2, p3):
-		# Solve derivative roots in [0,1] for one axis
-		def cubic_extrema(a, b, c, d):
-			A = -a + 3*b - 3*c + d
-			B = 2*(a - 2*b + c)
-			C = b - a
-			ts = []
-			if abs(A) < 1e-12:
-				if abs(B) > 1e-12:
-					t = -C / B
-					if 0 < t < 1:
-						ts.append(t)
-			else:
-				discriminant = B*B - 4*A*C
-				if discriminant >= 0:
-					sqrtD = discriminant ** 0.5
-					t1 = (-B + sqrtD) / (2*A)
-					t2 = (-B - sqrtD) / (2*A)
-					for t in [t1, t2]:
-						if 0 < t < 1:
-							ts.append(t)
-			return ts
-		# X-axis extrema
-		tx = cubic_extrema(p0.x, p1.x, p2.x, p3.x)
-		xs = [p0.x, p3.x] + [((1-t)**3 * p0.x + 3*(1-t)**2*t*p1.x + 3*(1-t)*t**2*p2.x + t**3*p3.x) for t in tx]
-		min_x, max_x = min(xs), max(xs)
-		# Y-axis extrema
-		ty = cubic_extrema(p0.y, p1.y, p2.y, p3.y)
-		ys = [p0.y, p3.y] + [((1-t)**3 * p0.y + 3*(1-t)**2*t*p1.y + 3*(1-t)*t**2*p2.y + t**3*p3.y) for t in ty]
-		min_y, max_y = min(ys), max(ys)
-		return min_x, min_y, max_x, max_y
-	# Compute bounding box of any segment
-	def segment_bbox(segment_nodes, segment_handles):
-		# On-curve endpoints of segment
-		p0 = segment_nodes[0].position
-		p3 = segment_nodes[-1].position
-		# Cubic curve
-		if len(segment_handles) == 2:
-			p1 = segment_handles[0].position
-			p2 = segment_handles[1].position
-			return cubic_bezier_bbox(p0, p1, p2, p3)
-		# Quadratic curve
-		elif len(segment_handles) == 1:
-			p1 = segment_handles[0].position
-			# Approximation from quadratic to cubic
-			c0 = p0
-			c1 = NSPoint(p0.x + 2/3*(p1.x - p0.x), p0.y + 2/3*(p1.y - p0.y))
-			c2 = NSPoint(p3.x + 2/3*(p1.x - p3.x), p3.y + 2/3*(p1.y - p3.y))
-			c3 = p3
-			return cubic_bezier_bbox(c0, c1, c2, c3)
-		# Line (or any broken segment with 3+ handles)
+# Polynomial coefficients of one cubic curve axis
+def cubic_coefficients(p0, p1, p2, p3):
+	a = -p0 + 3*p1 - 3*p2 + p3
+	b = 3*p0 - 6*p1 + 3*p2
+	c = 3*p1 - 3*p0
+	return a, b, c, p0
+
+
+
+# Solve cubic curve derivative 3*a*t^2 + 2*b*t + c roots in [0,1] for one axis
+def cubic_extrema(a, b, c):
+	A = 3*a
+	B = 2*b
+	ts = []
+	if abs(A) < 1e-12:
+		if abs(B) > 1e-12:
+			t = -c / B
+			if 0 < t < 1:
+				ts.append(t)
+	else:
+		discriminant = B*B - 4*A*c
+		if discriminant >= 0:
+			sqrtD = discriminant ** 0.5
+			t1 = (-B + sqrtD) / (2*A)
+			t2 = (-B - sqrtD) / (2*A)
+			for t in [t1, t2]:
+				if 0 < t < 1:
+					ts.append(t)
+	return ts
+
+
+
+# Compute bounding box of a cubic curve segment
+# Curve is converted from Bernstein form to polynomial a*t^3 + b*t^2 + c*t + d once per axis
+# So each extremum is evaluated in Horner form with 3 multiplications
+def cubic_bezier_bbox(p0, p1, p2, p3):
+	x0, y0 = p0
+	x1, y1 = p1
+	x2, y2 = p2
+	x3, y3 = p3
+	# X-axis extrema
+	ax, bx, cx, dx = cubic_coefficients(x0, x1, x2, x3)
+	xs = [x0, x3] + [((ax*t + bx)*t + cx)*t + dx for t in cubic_extrema(ax, bx, cx)]
+	min_x, max_x = min(xs), max(xs)
+	# Y-axis extrema
+	ay, by, cy, dy = cubic_coefficients(y0, y1, y2, y3)
+	ys = [y0, y3] + [((ay*t + by)*t + cy)*t + dy for t in cubic_extrema(ay, by, cy)]
+	min_y, max_y = min(ys), max(ys)
+	return min_x, min_y, max_x, max_y
+
+
+
+# Extremum of one quadratic curve axis evaluated in Horner form
+def quadratic_extrema(p0, p1, p2):
+	a = p0 - 2*p1 + p2
+	b = 2*(p1 - p0)
+	if abs(a) < 1e-12:
+		return []
+	t = -b / (2*a)
+	if 0 < t < 1:
+		return [(a*t + b)*t + p0]
+	return []
+
+
+
+# Compute bounding box of a quadratic curve segment
+# Curve is converted to polynomial a*t^2 + b*t + c once per axis, its derivative has a single root
+def quadratic_bezier_bbox(p0, p1, p2):
+	x0, y0 = p0
+	x1, y1 = p1
+	x2, y2 = p2
+	xs = [x0, x2] + quadratic_extrema(x0, x1, x2)
+	ys = [y0, y2] + quadratic_extrema(y0, y1, y2)
+	return min(xs), min(ys), max(xs), max(ys)
+
+
+
+# Split cubic curve by De Casteljau subdivision until each part is flat enough to be a straight piece
+# Flat part has both handles close to its chord and within chord length
+# Appends the first point of each straight piece to vertices
+def flatten_cubic(p0, p1, p2, p3, tolerance_sq, vertices, depth=0):
+	x0, y0 = p0
+	x1, y1 = p1
+	x2, y2 = p2
+	x3, y3 = p3
+	chord_x, chord_y = x3 - x0, y3 - y0
+	chord_sq = chord_x*chord_x + chord_y*chord_y
+	if chord_sq == 0:
+		# Collapsed chord, measure handles from the node
+		flat = (
+			(x1 - x0)*(x1 - x0) + (y1 - y0)*(y1 - y0) <= tolerance_sq
+			and (x2 - x0)*(x2 - x0) + (y2 - y0)*(y2 - y0) <= tolerance_sq
+		)
+	else:
+		# Handles deflection from chord (multiplied by chord length)
+		deflection1 = (x1 - x0)*chord_y - (y1 - y0)*chord_x
+		deflection2 = (x2 - x0)*chord_y - (y2 - y0)*chord_x
+		# Handles projection onto chord (multiplied by chord length)
+		projection1 = (x1 - x0)*chord_x + (y1 - y0)*chord_y
+		projection2 = (x2 - x0)*chord_x + (y2 - y0)*chord_y
+		flat = (
+			max(deflection1*deflection1, deflection2*deflection2) <= tolerance_sq * chord_sq
+			and 0 <= projection1 <= chord_sq and 0 <= projection2 <= chord_sq
+		)
+	# Depth limit protects from endless subdivision of degenerate curves
+	# Each level quarters the deflection, so 10 levels (up to 1024 pieces) flatten far larger curves than a glyph has
+	if flat or depth >= 10:
+		vertices.append(p0)
+		return
+	# Split in the middle
+	x01, y01 = (x0 + x1) / 2, (y0 + y1) / 2
+	x12, y12 = (x1 + x2) / 2, (y1 + y2) / 2
+	x23, y23 = (x2 + x3) / 2, (y2 + y3) / 2
+	x012, y012 = (x01 + x12) / 2, (y01 + y12) / 2
+	x123, y123 = (x12 + x23) / 2, (y12 + y23) / 2
+	mid = ((x012 + x123) / 2, (y012 + y123) / 2)
+	flatten_cubic(p0, (x01, y01), (x012, y012), mid, tolerance_sq, vertices, depth + 1)
+	flatten_cubic(mid, (x123, y123), (x23, y23), p3, tolerance_sq, vertices, depth + 1)
+
+
+
+# Compute bounding box and virtual polyline of any segment in one pass over its points
+# Returns bounding box and straight pieces of polyline as (start x, start y, vector x, vector y, inverse squared length)
+def segment_geometry(segment_points, segment_handles, step):
+	# On-curve endpoints of segment
+	p0 = segment_points[0]
+	p3 = segment_points[-1]
+	tolerance = step / 4
+	vertices = []
+	# Cubic curve
+	if len(segment_handles) == 2:
+		p1 = segment_handles[0]
+		p2 = segment_handles[1]
+		bbox = cubic_bezier_bbox(p0, p1, p2, p3)
+		flatten_cubic(p0, p1, p2, p3, tolerance*tolerance, vertices)
+	# Quadratic curve
+	elif len(segment_handles) == 1:
+		p1 = segment_handles[0]
+		bbox = quadratic_bezier_bbox(p0, p1, p3)
+		# Exact conversion from quadratic to cubic
+		c1 = (p0[0] + 2/3*(p1[0] - p0[0]), p0[1] + 2/3*(p1[1] - p0[1]))
+		c2 = (p3[0] + 2/3*(p1[0] - p3[0]), p3[1] + 2/3*(p1[1] - p3[1]))
+		flatten_cubic(p0, c1, c2, p3, tolerance*tolerance, vertices)
+	# Line (or any broken segment with 3+ handles)
+	# Polyline is a single piece between endpoints, so they are enough for bounding box
+	else:
+		(x0, y0), (x3, y3) = p0, p3
+		bbox = min(x0, x3), min(y0, y3), max(x0, x3), max(y0, y3)
+		vertices.append(p0)
+	vertices.append(p3)
+	pieces = []
+	for (ax, ay), (bx, by) in zip(vertices, vertices[1:]):
+		dx, dy = bx - ax, by - ay
+		length_sq = dx*dx + dy*dy
+		# Collapsed piece is measured from its start
+		inverse_length_sq = 1 / length_sq if length_sq else 0
+		pieces.append((ax, ay, dx, dy, inverse_length_sq))
+	return bbox, pieces
+
+
+
+# Split path into segments by node types
+# Save on-curve indices, indices of all segment nodes and indices of its handles
+def index_path_topology(node_types):
+	topology = []
+	oncurve_indices = [i for i, node_type in enumerate(node_types) if node_type != OFFCURVE]
+	for i in range(len(oncurve_indices)):
+		# Indices of first and last on-curve nodes on segment
+		i1 = oncurve_indices[i]
+		i2 = oncurve_indices[(i + 1) % len(oncurve_indices)]
+		# Collect all segment nodes including handles
+		if i1 <= i2:
+			segment_indices = tuple(range(i1, i2 + 1))
 		else:
-			xs = [n.position.x for n in segment_nodes]
-			ys = [n.position.y for n in segment_nodes]
-			return min(xs), min(ys), max(xs), max(ys)
-	# Place virtual points along segment shape
-	def segment_virtual_points(segment_nodes, segment_handles, step):
-		# On-curve endpoints of segment
-		p0 = segment_nodes[0].position
-		p3 = segment_nodes[-1].position
-		# Rough (straight-line) segment length between endpoints
-		seg_length = ((p3.x - p0.x)**2 + (p3.y - p0.y)**2) ** 0.5
-		num_points = max(2, int(seg_length / step) + 1)
-		virtual_points = []
-		# Cubic curve
-		if len(segment_handles) == 2:
-			p1 = segment_handles[0].position
-			p2 = segment_handles[1].position
-			ax = -p0.x + 3 * p1.x - 3 * p2.x + p3.x
-			ay = -p0.y + 3 * p1.y - 3 * p2.y + p3.y
-			bx = 3 * p0.x - 6 * p1.x + 3 * p2.x
-			by = 3 * p0.y - 6 * p1.y + 3 * p2.y
-			cx = -3 * p0.x + 3 * p1.x
-			cy = -3 * p0.y + 3 * p1.y
-			dx0, dy0 = p0.x, p0.y
-			for k in range(num_points):
-				t = k / (num_points - 1)
-				x = ((ax * t + bx) * t + cx) * t + dx0
-				y = ((ay * t + by) * t + cy) * t + dy0
-				virtual_points.append((x, y))
-		# Quadratic curve
-		elif len(segment_handles) == 1:
-			p1 = segment_handles[0].position
-			for t in [k / (num_points - 1) for k in range(num_points)]:
-				x = (1 - t) ** 2 * p0.x + 2 * (1 - t) * t * p1.x + t ** 2 * p3.x
-				y = (1 - t) ** 2 * p0.y + 2 * (1 - t) * t * p1.y + t ** 2 * p3.y
-				virtual_points.append((x, y))
-		# Line (or any broken segment with 3+ handles)
+			segment_indices = tuple(range(i1, len(node_types))) + tuple(range(0, i2 + 1))
+		handle_indices = tuple(k for k in segment_indices[1:-1] if node_types[k] == OFFCURVE)
+		topology.append((i1, i2, segment_indices, handle_indices))
+	return topology
+
+
+
+# Squared distance from point to bounding box (zero if point is inside)
+def bbox_distance_sq(bbox, x, y):
+	min_x, min_y, max_x, max_y = bbox
+	dx = max(min_x - x, 0, x - max_x)
+	dy = max(min_y - y, 0, y - max_y)
+	return dx*dx + dy*dy
+
+
+
+# Squared distance from the closest point of virtual polyline to a given point
+# Shared by NS1 and NE1 checks
+# Point is projected onto each piece, and projection is clamped to the piece ends
+def virtual_pieces_distance_sq(pieces, x, y):
+	best_sq = float("inf")
+	for ax, ay, dx, dy, inverse_length_sq in pieces:
+		# Vector from piece start to point
+		ex = x - ax
+		ey = y - ay
+		# Position of projection along the piece
+		t = (ex * dx + ey * dy) * inverse_length_sq
+		if t < 0:
+			t = 0
+		elif t > 1:
+			t = 1
+		# Vector from projection to point
+		ox = ex - t * dx
+		oy = ey - t * dy
+		dist_sq = ox * ox + oy * oy
+		if dist_sq < best_sq:
+			best_sq = dist_sq
+	return best_sq
+
+
+
+# Find closest area on closest path and detect nodes for connection
+# If paths are known to be unchanged since the last search (like during a single mouse drag),
+# their saved segments are reused without reading the nodes again
+def identify_closest_area(paths, new_path, NS1, NE1, paths_unchanged=False):
+	# Read connection nodes positions once, all distance checks below use these plain floats
+	NS1_x, NS1_y = NS1.x, NS1.y
+	NE1_x, NE1_y = NE1.x, NE1.y
+	# Segment geometry is read from nodes once per path and passed to module-level functions as (x, y) coordinate tuples
+	# Index segments of path, or take them from cache if path wasn't changed since last search
+	# Save on-curve indices, bounding box and virtual polyline of each segment
+	# Segment topology is reused while node types are the same, like when nodes were only moved
+	def index_path_segments(path):
+		cached = segments_cache.get(id(path))
+		# Number of nodes is still checked, in case path was edited by a delayed request during the drag
+		if paths_unchanged and cached is not None and len(cached[0]) == len(path.nodes):
+			return cached
+		# Read coordinates and types of all nodes at once
+		# Any moved, added or removed node changes the fingerprint
+		fingerprint = tuple((n.x, n.y, n.type) for n in path.nodes)
+		if cached is not None and cached[0] == fingerprint:
+			return cached
+		node_types = tuple(node_type for x, y, node_type in fingerprint)
+		if cached is not None and cached[2] == node_types:
+			topology = cached[3]
 		else:
-			for t in [k / (num_points - 1) for k in range(num_points)]:
-				x = p0.x + (p3.x - p0.x) * t
-				y = p0.y + (p3.y - p0.y) * t
-				virtual_points.append((x, y))
-		return virtual_points
+			topology = index_path_topology(node_types)
+		points = [(x, y) for x, y, node_type in fingerprint]
+		path_segments = []
+		step = CLOSEST_AREA_VIRTUAL_POINT_STEP
+		# For each segment
+		for i1, i2, segment_indices, handle_indices in topology:
+			segment_points = [points[k] for k in segment_indices]
+			segment_handles = [points[k] for k in handle_indices]
+			bbox, pieces = segment_geometry(segment_points, segment_handles, step)
+			path_segments.append((i1, i2, bbox, pieces))
+		# Bounding box of whole path is union of its segments bounding boxes
+		path_bbox = None
+		if path_segments:
+			path_bbox = (
+				min(segment[2][0] for segment in path_segments),
+				min(segment[2][1] for segment in path_segments),
+				max(segment[2][2] for segment in path_segments),
+				max(segment[2][3] for segment in path_segments),
+			)
+		return fingerprint, path_segments, node_types, topology, path_bbox
+	# --------------------------------------------------
+	# Nothing to merge with if there are no paths except new path
+	existing_paths = [path for path in paths if new_path is None or path is not new_path]
+	if not existing_paths:
+		return None, None, None, None, None, None, False
+	# Index segments of all paths except new path
+	segments = []
+	indexed_paths = {}
+	for path in existing_paths:
+		indexed = index_path_segments(path)
+		indexed_paths[id(path)] = indexed
+		for segment in indexed[1]:
+			segments.append((path,) + segment)
+	# Keep cache only for paths of the current search
+	segments_cache.clear()
+	segments_cache.update(indexed_paths)
+	# --------------------------------------------------
+	# Query the index for candidate segments
+	# Virtual polyline of each segment starts exactly at its first on-curve node
+	# So the best distances can't be greater than distances to the closest on-curve nodes
+	# Segment which bounding box lies farther than that from both NS1 and NE1 will never be the closest
+	bound_start_sq = float("inf")
+	bound_end_sq = float("inf")
+	for segment in segments:
+		x0, y0 = segment[4][0][0], segment[4][0][1]
+		bound_start_sq = min(bound_start_sq, (x0 - NS1_x) * (x0 - NS1_x) + (y0 - NS1_y) * (y0 - NS1_y))
+		bound_end_sq = min(bound_end_sq, (x0 - NE1_x) * (x0 - NE1_x) + (y0 - NE1_y) * (y0 - NE1_y))
+	# Segments bounding boxes lie inside bounding box of their path
+	# So all segments of path which bounding box is farther than bounds are skipped at once
+	candidates = []
+	for path in existing_paths:
+		fingerprint, path_segments, node_types, topology, path_bbox = indexed_paths[id(path)]
+		if path_bbox is None:
+			continue
+		if (
+			bbox_distance_sq(path_bbox, NS1_x, NS1_y) > bound_start_sq
+			and bbox_distance_sq(path_bbox, NE1_x, NE1_y) > bound_end_sq
+		):
+			continue
+		for segment in path_segments:
+			bbox = segment[2]
+			dist_start_sq = bbox_distance_sq(bbox, NS1_x, NS1_y)
+			dist_end_sq = bbox_distance_sq(bbox, NE1_x, NE1_y)
+			if dist_start_sq <= bound_start_sq or dist_end_sq <= bound_end_sq:
+				candidates.append(((path,) + segment, dist_start_sq, dist_end_sq))
 	# --------------------------------------------------
 	# Find two closest segments on the same path using candidates
 	best_path = None
 	closest_start_segment = None
 	closest_end_segment = None
-	min_dist_start = float("inf")
-	min_dist_end = float("inf")
-	# Check all paths except new path
-	for path in paths:
-		if new_path is not None and path is new_path:
+	# Squared distances are enough to compare, so no square root is needed
+	min_dist_start_sq = float("inf")
+	min_dist_end_sq = float("inf")
+	for (path, i1, i2, bbox, pieces), dist_start_sq, dist_end_sq in candidates:
+		# --------------------------------------------------
+		# Quick distance check using bounding box of segment
+		# Skip segment if the best distances to NS1 and NE1 can't be improved
+		if dist_start_sq >= min_dist_start_sq and dist_end_sq >= min_dist_end_sq:
 			continue
-		nodes = path.nodes
-		# For each segment
-		oncurve_indices = [i for i, n in enumerate(nodes) if n.type != OFFCURVE]
-		for i in range(len(oncurve_indices)):
-			# Indices of first and last on-curve nodes on segment
-			i1 = oncurve_indices[i]
-			i2 = oncurve_indices[(i + 1) % len(oncurve_indices)]
-			# Collect all segment nodes including handles
-			if i1 <= i2:
-				segment_nodes = nodes[i1:i2 + 1]
-			else:
-				segment_nodes = nodes[i1:] + nodes[:i2 + 1]
-			segment_handles = [n for n in segment_nodes[1:-1] if n.type == OFFCURVE]
-			# --------------------------------------------------
-			# Quick distance check using bounding box of segment
-			# Get bounding box
-			min_x, min_y, max_x, max_y = segment_bbox(segment_nodes, segment_handles)
-			# Compare distance from bounding box to NS1 and NE1
-			dx = max(min_x - NS1.x, 0, NS1.x - max_x)
-			dy = max(min_y - NS1.y, 0, NS1.y - max_y)
-			dist_start = math.hypot(dx, dy)
-			dx = max(min_x - NE1.x, 0, NE1.x - max_x)
-			dy = max(min_y - NE1.y, 0, NE1.y - max_y)
-			dist_end = math.hypot(dx, dy)
-			# Skip segment if the best distances to NS1 and NE1 can't be improved
-			if dist_start >= min_dist_start and dist_end >= min_dist_end:
-				continue
-			# --------------------------------------------------
-			# Extended distance check by placing a virtual points along segment shape
-			step = CLOSEST_AREA_VIRTUAL_POINT_STEP
-			virtual_points = segment_virtual_points(segment_nodes, segment_handles, step)
-			# Compare distance from each virtual point to NS1 and NE1
-			for (vx, vy) in virtual_points:
-				dx_s, dy_s = vx - NS1.x, vy - NS1.y
-				dx_e, dy_e = vx - NE1.x, vy - NE1.y
-				d_start = (dx_s**2 + dy_s**2) ** 0.5
-				d_end = (dx_e**2 + dy_e**2) ** 0.5
-				if d_start < min_dist_start:
-					min_dist_start = d_start
-					closest_start_segment = (i1, i2)
-					best_path = path
-				if d_end < min_dist_end:
-					min_dist_end = d_end
-					closest_end_segment = (i1, i2)
-					best_path = path
+		# --------------------------------------------------
+		# Extended distance check by virtual polyline placed along segment shape
+		# Find squared distance from the closest polyline point to NS1 and NE1
+		# Measure only the side that bounding box check couldn't reject
+		if dist_start_sq < min_dist_start_sq:
+			d_start_sq = virtual_pieces_distance_sq(pieces, NS1_x, NS1_y)
+			if d_start_sq < min_dist_start_sq:
+				min_dist_start_sq = d_start_sq
+				closest_start_segment = (i1, i2)
+				best_path = path
+		if dist_end_sq < min_dist_end_sq:
+			d_end_sq = virtual_pieces_distance_sq(pieces, NE1_x, NE1_y)
+			if d_end_sq < min_dist_end_sq:
+				min_dist_end_sq = d_end_sq
+				closest_end_segment = (i1, i2)
+				best_path = path
 	# --------------------------------------------------
 	if best_path is None:
 		return None, None, None, None, None, None, False
@@ -246,30 +453,44 @@ def identify_closest_area(paths, new_path, NS1, NE1):
 			return list(range(s, e + 1))
 		else:
 			return list(range(s, total_nodes)) + list(range(0, e + 1))
-	# Build sets of indices to cover (both closest segments including off-curve nodes)
-	start_pair_set = set(expand_segment_indices(closest_start_segment))
-	end_pair_set   = set(expand_segment_indices(closest_end_segment))
-	required_set = start_pair_set.union(end_pair_set)
-	# Walk from start_index with given step until we've visited all required indices
+	# Both closest segments are contiguous arcs of indices, so walks are measured directly
+	# Number of steps forward from origin until every index of arc a..b is visited
+	def forward_reach(origin, a, b):
+		arc_length = (b - a) % total_nodes
+		offset = (origin - a) % total_nodes
+		# Origin inside arc (not at its start), index right before origin is reached last
+		if 0 < offset <= arc_length:
+			return total_nodes - 1
+		return (b - origin) % total_nodes
+	# Number of steps backward from origin until every index of arc a..b is visited
+	def backward_reach(origin, a, b):
+		arc_length = (b - a) % total_nodes
+		offset = (b - origin) % total_nodes
+		# Origin inside arc (not at its end), index right after origin is reached last
+		if 0 < offset <= arc_length:
+			return total_nodes - 1
+		return (origin - a) % total_nodes
+	# Walk from start_index with given step until we've visited all indices of both closest segments
 	# Returns the visited list in walk order
 	def walk_until_covered(start_index, step):
-		visited = []
-		seen = set()
-		i = start_index
-		max_steps = total_nodes * 2  # safety cap (should not be hit)
-		steps = 0
-		while True:
-			if i not in seen:
-				visited.append(i)
-				seen.add(i)
-			# Stop when we've covered all required nodes and we've visited at least one step
-			if required_set.issubset(seen) and steps >= 0:
-				break
-			i = (i + step) % total_nodes
-			steps += 1
-			if steps > max_steps:
-				break
-		return visited
+		if step > 0:
+			reach = max(
+				forward_reach(start_index, start_seg_start, start_seg_end),
+				forward_reach(start_index, end_seg_start, end_seg_end),
+			)
+			stop = start_index + reach + 1
+			if stop <= total_nodes:
+				return list(range(start_index, stop))
+			return list(range(start_index, total_nodes)) + list(range(0, stop - total_nodes))
+		else:
+			reach = max(
+				backward_reach(start_index, start_seg_start, start_seg_end),
+				backward_reach(start_index, end_seg_start, end_seg_end),
+			)
+			stop = start_index - reach - 1
+			if stop >= -1:
+				return list(range(start_index, stop, -1))
+			return list(range(start_index, -1, -1)) + list(range(total_nodes - 1, stop + total_nodes, -1))
 	# Two candidate walks
 	# Forward candidate: start at the start node of the start pair, walk +1
 	forward_walk = walk_until_covered(start_seg_start, 1)
@@ -281,20 +502,20 @@ def identify_closest_area(paths, new_path, NS1, NE1):
 	else:
 		closest_area = backward_walk
 	# Geometric fallback for identical start/end segments
-	if (
-		closest_start_segment == closest_end_segment
-		or set(expand_segment_indices(closest_start_segment)) == set(expand_segment_indices(closest_end_segment))
-	):
+	# Segment is a contiguous arc from its first to its last on-curve node, so equal nodes mean equal pairs
+	if closest_start_segment == closest_end_segment:
 		# Geometric fallback for identical start/end segments considering both NS1 and NE1
 		# Include all nodes of the segment (off-curves too)
 		seg_indices = expand_segment_indices(closest_start_segment)
 		i1, i2 = seg_indices[0], seg_indices[-1]
 		n1, n2 = nodes[i1], nodes[i2]
+		n1_x, n1_y = n1.x, n1.y
+		n2_x, n2_y = n2.x, n2.y
 		# Compute squared distances to NS1 and NE1
-		d1_to_NS1 = (n1.x - NS1.x) ** 2 + (n1.y - NS1.y) ** 2
-		d2_to_NS1 = (n2.x - NS1.x) ** 2 + (n2.y - NS1.y) ** 2
-		d1_to_NE1 = (n1.x - NE1.x) ** 2 + (n1.y - NE1.y) ** 2
-		d2_to_NE1 = (n2.x - NE1.x) ** 2 + (n2.y - NE1.y) ** 2
+		d1_to_NS1 = (n1_x - NS1_x) * (n1_x - NS1_x) + (n1_y - NS1_y) * (n1_y - NS1_y)
+		d2_to_NS1 = (n2_x - NS1_x) * (n2_x - NS1_x) + (n2_y - NS1_y) * (n2_y - NS1_y)
+		d1_to_NE1 = (n1_x - NE1_x) * (n1_x - NE1_x) + (n1_y - NE1_y) * (n1_y - NE1_y)
+		d2_to_NE1 = (n2_x - NE1_x) * (n2_x - NE1_x) + (n2_y - NE1_y) * (n2_y - NE1_y)
 		# Compare both possible orientations
 		sum1 = d1_to_NS1 + d2_to_NE1
 		sum2 = d2_to_NS1 + d1_to_NE1
@@ -363,17 +584,22 @@ def merge_paths(layer, closest_path, closest_area, CS1, new_path):
 	for n in nodes_to_remove:
 		closest_path.removeNode_(n)
 	# --------------------------------------------------
+	# Index of CS1 after removal is known from closest area
+	# CS1 shifts back by the number of removed nodes that were before it
+	CS1_index = closest_area[0] - sum(1 for i in closest_area[1:-1] if i < closest_area[0])
+	# Derived index is checked against CS1 itself, CS1 is searched in nodes only if they don't match
+	num_nodes = len(closest_path.nodes)
+	if not (0 <= CS1_index < num_nodes and closest_path.nodes[CS1_index] is CS1):
+		CS1_index = closest_path.nodes.index(CS1)
+	# --------------------------------------------------
 	# Fix CE1 (last node in closest area) node type if originally it wasn't LINE
 	# After removing nodes, CS1-CE1 becomes line segment, so CE1 type should be updated
-	num_nodes = len(closest_path.nodes)
-	idx_CS1 = closest_path.nodes.index(CS1)
-	idx_CE1 = (idx_CS1 + 1) % num_nodes
+	idx_CE1 = (CS1_index + 1) % num_nodes
 	CE1_temporary = closest_path.nodes[idx_CE1]
 	if CE1_temporary.type != LINE:
 		CE1_temporary.type = LINE
 	# --------------------------------------------------
 	# Inserts nodes from new path immediately after CS1
-	CS1_index = closest_path.nodes.index(CS1)
 	inserted_nodes = []
 	for offset, n in enumerate(new_path.nodes):
 		new_node = GSNode(n.position, n.type)
@@ -399,12 +625,17 @@ def merge_paths(layer, closest_path, closest_area, CS1, new_path):
 
 # Adjust new path connection nodes and handles to preserve existing path smothness
 def adjust_connections(NS1, NS1h, NE1, NE1h, CS1, CE1, CS_vector, CE_vector, closest_path):
+	# Bind math function and constants to local names once for both sides
+	hypot = math.hypot
+	adjust_max_distance = CONNECTION_ADJUST_MAX_DISTANCE
+	collapse_max_distance = CONNECTION_COLLAPSE_MAX_DISTANCE
+	handle_min_length = CONNECTION_HANDLE_MIN_LENGTH
 	def adjust_pair(N1, N1h, O1, vector):
 		# Vector verification and normalization
 		if vector is None:
 			return
 		vector_x, vector_y = vector
-		vector_length = math.hypot(vector_x, vector_y)
+		vector_length = hypot(vector_x, vector_y)
 		if vector_length == 0:
 			return
 		# Normalized vector direction
@@ -418,14 +649,14 @@ def adjust_connections(NS1, NS1h, NE1, NE1h, CS1, CE1, CS_vector, CE_vector, clo
 		projection_y = origin_y + projection_length * unit_y
 		# Measure distance from projected N to O
 		offset_x, offset_y = origin_x - projection_x, origin_y - projection_y
-		distance = math.hypot(offset_x, offset_y)
+		distance = hypot(offset_x, offset_y)
 		# Limit distance if it is greater than adjustment range
-		if distance > CONNECTION_ADJUST_MAX_DISTANCE:
+		if distance > adjust_max_distance:
 			offset_x /= distance
 			offset_y /= distance
-			origin_x = projection_x + offset_x * CONNECTION_ADJUST_MAX_DISTANCE
-			origin_y = projection_y + offset_y * CONNECTION_ADJUST_MAX_DISTANCE
-			distance = CONNECTION_ADJUST_MAX_DISTANCE
+			origin_x = projection_x + offset_x * adjust_max_distance
+			origin_y = projection_y + offset_y * adjust_max_distance
+			distance = adjust_max_distance
 		# Midpoint position between N and O (or limited O) nodes
 		N1_target_x = (projection_x + origin_x) / 2.0
 		N1_target_y = (projection_y + origin_y) / 2.0
@@ -442,13 +673,13 @@ def adjust_connections(NS1, NS1h, NE1, NE1h, CS1, CE1, CS_vector, CE_vector, clo
 			if handle_distance < 0:
 				handle_distance = 0
 			# Apply minimum handle length rule
-			if handle_distance < CONNECTION_HANDLE_MIN_LENGTH:
-				handle_distance = CONNECTION_HANDLE_MIN_LENGTH
+			if handle_distance < handle_min_length:
+				handle_distance = handle_min_length
 			# Compute handle target along the same O1-N1-N1h line
 			N1h_target_x = N1_target_x + unit_x * handle_distance
 			N1h_target_y = N1_target_y + unit_y * handle_distance
 		# --------------------------------------------------
-		if distance <= CONNECTION_COLLAPSE_MAX_DISTANCE:
+		if distance <= collapse_max_distance:
 			# Move new path connection node directly to O1 position
 			N1.x, N1.y = O1.x, O1.y
 			# Remove O1 (closest path connection node) after collapse
@@ -486,138 +717,14 @@ def normalize_connections_handles(NS1, NS1h, NS2h, NS2, NE1, NE1h, NE2h, NE2):
 
 
 # Shorten handles (on segment) that have a loop or inflection
-# THIS IS A COPY OF FUNCTION FROM SIMPLIFY PATH SCRIPT
+# Same math as in Simplify Path script, except handles that intersect are shortened down to a fixed minimal length
+# Connection segments keep their handles as long as possible, instead of 1/5 of segment length
 def shorten_inflected_handles_on_segment(n1, h1, h2, n2):
-	INTERSECTION_MIN_LENGTH = 1
-	INTERSECTION_BUFFER = 1
-	INFLECTION_MIN_ANGLE = 45
-	INFLECTION_HANDLE_MIN_LENGTH = 1
-	# Skip segments with collapsed nodes or zero handles
-	seg_len = math.hypot(n2.x - n1.x, n2.y - n1.y)
-	h1_len = math.hypot(h1.x - n1.x, h1.y - n1.y)
-	h2_len = math.hypot(h2.x - n2.x, h2.y - n2.y)
-	if seg_len == 0 or h1_len == 0 or h2_len == 0:
-		return
-	# --------------------------------------------------
-	# Intersection case
-	# Check inflection (single intersection)
-	# Check loop (double intersection)
-	def intersection_of_vectors(n1, h1, n2, h2):
-		x1, y1 = n1.x, n1.y
-		x2, y2 = h1.x, h1.y
-		x3, y3 = n2.x, n2.y
-		x4, y4 = h2.x, h2.y
-		det = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
-		if det == 0:
-			return None
-		px = ((x1 * y2 - y1 * x2) * (x3 - x4) - (x1 - x2) * (x3 * y4 - y3 * x4)) / det
-		py = ((x1 * y2 - y1 * x2) * (y3 - y4) - (y1 - y2) * (x3 * y4 - y3 * x4)) / det
-		return (px, py)
-	interpoint = intersection_of_vectors(n1, h1, n2, h2)
-	intersection = False
-	dist1 = dist2 = None
-	if interpoint is not None:
-		# Check if both handles tips are exactly in the same coordinate
-		if (h1.x, h1.y) == (h2.x, h2.y):
-			intersection = True
-			dist1 = max(0, h1_len - INTERSECTION_BUFFER)
-			dist2 = max(0, h2_len - INTERSECTION_BUFFER)
-		else:
-			# Check vectors and distances
-			v1_to_inter = (interpoint[0] - n1.x, interpoint[1] - n1.y)
-			v2_to_inter = (interpoint[0] - n2.x, interpoint[1] - n2.y)
-			v1_dir = (h1.x - n1.x, h1.y - n1.y)
-			v2_dir = (h2.x - n2.x, h2.y - n2.y)
-			# Check if intersection is on front side (between nodes)
-			dist1 = max(0, math.hypot(v1_to_inter[0], v1_to_inter[1]) - INTERSECTION_BUFFER)
-			dist2 = max(0, math.hypot(v2_to_inter[0], v2_to_inter[1]) - INTERSECTION_BUFFER)
-			dot1 = v1_to_inter[0]*v1_dir[0] + v1_to_inter[1]*v1_dir[1]
-			dot2 = v2_to_inter[0]*v2_dir[0] + v2_to_inter[1]*v2_dir[1]
-			# Check if at least one handle overshot the vector of other handle
-			# Skip the case when handle tip lies on vector of other handle but not overshot it
-			if (dot1 > 0 and dot2 > 0) and ((dist1 + INTERSECTION_BUFFER) < h1_len or (dist2 + INTERSECTION_BUFFER) < h2_len):
-				# One or both handles have intersection on the front side
-				intersection = True
-	if intersection:
-		# Shorten handles that go beyond intersection point
-		# Check first handle
-		if dist1 < h1_len and h1_len > INTERSECTION_MIN_LENGTH:
-			new_len = max(dist1, INTERSECTION_MIN_LENGTH)
-			vx, vy = h1.x - n1.x, h1.y - n1.y
-			vlen = math.hypot(vx, vy)
-			if vlen != 0:
-				# Handle has intersection, correct it
-				h1.x = n1.x + vx / vlen * new_len
-				h1.y = n1.y + vy / vlen * new_len
-		# Check second handle
-		if dist2 < h2_len and h2_len > INTERSECTION_MIN_LENGTH:
-			new_len = max(dist2, INTERSECTION_MIN_LENGTH)
-			vx, vy = h2.x - n2.x, h2.y - n2.y
-			vlen = math.hypot(vx, vy)
-			if vlen != 0:
-				# Handle has intersection, correct it
-				h2.x = n2.x + vx / vlen * new_len
-				h2.y = n2.y + vy / vlen * new_len
-	# --------------------------------------------------
-	# No intersection case
-	# Check S-like inflection (almost parallel handles turned towards each other)
-	else:
-		# Find angle between handles
-		v1x, v1y = h1.x - n1.x, h1.y - n1.y
-		v2x, v2y = h2.x - n2.x, h2.y - n2.y
-		dot = v1x * v2x + v1y * v2y
-		cos_angle = max(-1, min(1, dot / (h1_len * h2_len)))
-		angle_deg = math.degrees(math.acos(cos_angle))
-		# Detect handles pointing nearly opposite
-		if angle_deg > 180 - INFLECTION_MIN_ANGLE:
-			# Calculate distances
-			h1_n1 = math.hypot(h1.x - n1.x, h1.y - n1.y)
-			h2_n1 = math.hypot(h2.x - n1.x, h2.y - n1.y)
-			h1_n2 = math.hypot(h1.x - n2.x, h1.y - n2.y)
-			h2_n2 = math.hypot(h2.x - n2.x, h2.y - n2.y)
-			# Threshold for ignoring equal distances
-			THRESHOLD = 1.0
-			# Check if handles are closer to their own nodes
-			h1_closer_to_own = (h1_n1 - THRESHOLD) < h2_n1
-			h2_closer_to_own = (h2_n2 - THRESHOLD) < h1_n2
-			if not h1_closer_to_own or not h2_closer_to_own:
-				# Get segment vector
-				ux, uy = (n2.x - n1.x) / seg_len, (n2.y - n1.y) / seg_len
-				# Project each handle onto n1-n2 axis
-				def project_along_segment(px, py):
-					return (px - n1.x) * ux + (py - n1.y) * uy
-				n1_pos = 0
-				n2_pos = seg_len
-				h1_pos = project_along_segment(h1.x, h1.y)
-				h2_pos = project_along_segment(h2.x, h2.y)
-				# Project midpoint between handles onto n1-n2 axis
-				mid_x = (h1.x + h2.x) / 2.0
-				mid_y = (h1.y + h2.y) / 2.0
-				mid_pos = project_along_segment(mid_x, mid_y)
-				# New handles lengths (could be positive or negative at this step)
-				h1_new_len = mid_pos - n1_pos
-				h2_new_len = n2_pos - mid_pos
-				# Shorten distances so the handles will not collapse after adjustment
-				h1_new_len -= INTERSECTION_BUFFER
-				h2_new_len -= INTERSECTION_BUFFER
-				# Balance the handles if they appear out of segment axis
-				# Enforce minimum length by shifting both lengths
-				if h1_new_len < INFLECTION_HANDLE_MIN_LENGTH:
-					diff = INFLECTION_HANDLE_MIN_LENGTH - h1_new_len
-					h1_new_len = INFLECTION_HANDLE_MIN_LENGTH
-					h2_new_len -= diff
-				if h2_new_len < INFLECTION_HANDLE_MIN_LENGTH:
-					diff = INFLECTION_HANDLE_MIN_LENGTH - h2_new_len
-					h2_new_len = INFLECTION_HANDLE_MIN_LENGTH
-					h1_new_len -= diff
-				# Protect the handles from being zero width or falling behind its node
-				h1_new_len = max(h1_new_len, INFLECTION_HANDLE_MIN_LENGTH)
-				h2_new_len = max(h2_new_len, INFLECTION_HANDLE_MIN_LENGTH)
-				# Adjust handles
-				h1.x = n1.x + ((v1x / h1_len) * h1_new_len)
-				h1.y = n1.y + ((v1y / h1_len) * h1_new_len)
-				h2.x = n2.x + ((v2x / h2_len) * h2_new_len)
-				h2.y = n2.y + ((v2y / h2_len) * h2_new_len)
+	h1_target, h2_target = inflected_handles_targets(n1.x, n1.y, h1.x, h1.y, h2.x, h2.y, n2.x, n2.y, CONNECTION_INFLECTION_MIN_LENGTH)
+	if h1_target is not None:
+		h1.x, h1.y = h1_target
+	if h2_target is not None:
+		h2.x, h2.y = h2_target
 
 
 
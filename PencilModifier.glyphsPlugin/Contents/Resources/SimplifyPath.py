@@ -52,6 +52,69 @@ INFLECTION_S_MIN_ANGLE = 135
 
 # --------------------------------------------------
 
+# PRECOMPUTED
+
+# Cosines of angle constants
+# Angle checks compare cosines directly, because cosine decreases monotonically from 0 to 180 degrees
+SMOOTH_OUT_RIPPLES_COS = math.cos(math.radians(SMOOTH_OUT_RIPPLES_ANGLE))
+TIGHT_NODES_TURNS_COS = math.cos(math.radians(TIGHT_NODES_TURNS_ANGLE))
+DEGRADED_HANDLE_ALIGNED_COS = math.cos(math.radians(DEGRADED_HANDLE_ANGLE_TOLERANCE))
+DEGRADED_HANDLE_OPPOSED_COS = math.cos(math.radians(180 - DEGRADED_HANDLE_ANGLE_TOLERANCE))
+INFLECTION_S_MIN_COS = math.cos(math.radians(INFLECTION_S_MIN_ANGLE))
+
+# Squares of distance constants
+# Distances that are only compared with a threshold are compared squared
+TIGHT_NODES_THRESHOLD_SQ = TIGHT_NODES_THRESHOLD * TIGHT_NODES_THRESHOLD
+
+# --------------------------------------------------
+
+
+
+# Read types and positions of nodes at once
+# Node attributes are bridged from Glyphs objects, so geometry checks read them from this snapshot
+def snapshot_nodes(nodes):
+	types = [n.type for n in nodes]
+	positions = [(n.x, n.y) for n in nodes]
+	return types, positions
+
+
+
+# Find indices of previous/next on-curve neighbours of each node at once
+# Neighbour is the node right before/after (line segment) or 3 nodes away (curve segment)
+# Index is None if there is no such neighbour
+def on_curve_neighbors(types):
+	node_count = len(types)
+	prev_on = [None] * node_count
+	next_on = [None] * node_count
+	for i in range(node_count):
+		if i - 1 >= 0 and types[i - 1] != OFFCURVE:
+			prev_on[i] = i - 1
+		elif i - 3 >= 0 and types[i - 3] != OFFCURVE:
+			prev_on[i] = i - 3
+		if i + 1 < node_count and types[i + 1] != OFFCURVE:
+			next_on[i] = i + 1
+		elif i + 3 < node_count and types[i + 3] != OFFCURVE:
+			next_on[i] = i + 3
+	return prev_on, next_on
+
+
+
+# Find all node-node segments in a single walk over on-curve nodes
+# Returns (start, end) indices, where end is right after start (line) or 3 nodes away (curve)
+def on_curve_segments(types):
+	node_count = len(types)
+	oncurves = [i for i, t in enumerate(types) if t != OFFCURVE]
+	segments = []
+	for start, following in zip(oncurves, oncurves[1:]):
+		gap = following - start
+		# Line or curve segment between two on-curve nodes in a row
+		if gap == 1 or gap == 3:
+			segments.append((start, following))
+		# Single handle between nodes, curve segment ends 3 nodes away if there is on-curve node
+		elif gap == 2 and start + 3 < node_count and types[start + 3] != OFFCURVE:
+			segments.append((start, start + 3))
+	return segments
+
 
 
 # Smooth out ripples on almost straight sequences
@@ -60,28 +123,28 @@ def smooth_out_ripples(path):
 	node_count = len(nodes)
 	if node_count < 3:
 		return
+	# Snapshot is taken before any change, adjusted nodes are written to both nodes and snapshot
+	types, positions = snapshot_nodes(nodes)
 	# --------------------------------------------------
 	# Collect sequences
 	def collect_sequences():
-		# Vector between segments
-		def vector_between(nA, nB):
-			return (nB.x - nA.x, nB.y - nA.y)
-		# Angle between segments
-		def angle_between(v1, v2):
+		# Cosine of angle between segments
+		def cos_between(v1, len1, v2, len2):
 			dot = v1[0]*v2[0] + v1[1]*v2[1]
-			mag = math.hypot(v1[0], v1[1]) * math.hypot(v2[0], v2[1])
+			mag = len1 * len2
 			if mag == 0:
-				return 0
-			cosang = max(min(dot / mag, 1), -1)
-			return abs(math.degrees(math.acos(cosang)))
+				return 1
+			cos = dot / mag
+			# Clamp cosine to [-1, 1] with plain comparisons instead of min/max calls
+			return -1 if cos < -1 else (1 if cos > 1 else cos)
 		# Save sequence
 		def save_sequence(current_oncurves):
 			# Nodes/handles to adjust
 			adjust_from = current_oncurves[1]
 			adjust_to = current_oncurves[-2]
-			if nodes[adjust_from - 1].type == OFFCURVE:
+			if types[adjust_from - 1] == OFFCURVE:
 				adjust_from -= 1
-			if nodes[adjust_to + 1].type == OFFCURVE:
+			if types[adjust_to + 1] == OFFCURVE:
 				adjust_to += 1
 			adjust = list(range(adjust_from, adjust_to + 1))
 			# Nodes to remove
@@ -97,41 +160,37 @@ def smooth_out_ripples(path):
 				"remove": remove,
 			})
 		# --------------------------------------------------
+		# Collect node-node vectors and lengths of all segments in a single pass
+		segments = []
+		for i, nB_index in on_curve_segments(types):
+			# Segment could be either line or curve
+			vx, vy = positions[nB_index][0] - positions[i][0], positions[nB_index][1] - positions[i][1]
+			segments.append((i, nB_index, (vx, vy), math.sqrt(vx * vx + vy * vy)))
+		# --------------------------------------------------
 		# Data to return
 		sequences = []
 		# Data to compare
 		last_vector = None
+		last_length = None
 		current_start = None
 		current_oncurves = []
 		# Check each segment
-		for i in range(node_count - 1):
-			# Segment could be either line or curve
-			nA = nodes[i]
-			if nA.type == OFFCURVE:
-				continue
-			if i + 1 < node_count and nodes[i + 1].type != OFFCURVE:
-				nB = nodes[i + 1]
-				nB_index = i + 1
-			elif i + 3 < node_count and nodes[i + 3].type != OFFCURVE:
-				nB = nodes[i + 3]
-				nB_index = i + 3
-			else:
-				continue
-			# Compute node-node vector
-			v = vector_between(nA, nB)
+		for i, nB_index, v, length in segments:
 			# --------------------------------------------------
 			# Start new sequence
 			if current_start is None:
 				current_start = i
 				last_vector = v
+				last_length = length
 				# Store on-curve indices of segment
 				current_oncurves = [i, nB_index]
 				continue
 			# Check if still straight-ish
-			angle = angle_between(last_vector, v)
-			if angle <= SMOOTH_OUT_RIPPLES_ANGLE:
+			cos_angle = cos_between(last_vector, last_length, v, length)
+			if cos_angle >= SMOOTH_OUT_RIPPLES_COS:
 				# Continues sequence
 				last_vector = v
+				last_length = length
 				# Only append the new on-curve node if not duplicate
 				if current_oncurves[-1] != nB_index:
 					current_oncurves.append(nB_index)
@@ -143,6 +202,7 @@ def smooth_out_ripples(path):
 				# Start new sequence beginning at this node
 				current_start = i
 				last_vector = v
+				last_length = length
 				current_oncurves = [i, nB_index]
 		# Close final sequence at end of path
 		if current_start is not None and len(current_oncurves) >= 4:
@@ -154,23 +214,25 @@ def smooth_out_ripples(path):
 	def adjust_nodes(sequences):
 		for sequence in sequences:
 			# Average vector for adjusted nodes
-			ABx = sequence["node_to"].x - sequence["node_from"].x
-			ABy = sequence["node_to"].y - sequence["node_from"].y
+			adjust = sequence["adjust"]
+			Ax, Ay = positions[adjust[0]]
+			ABx = positions[adjust[-1]][0] - Ax
+			ABy = positions[adjust[-1]][1] - Ay
 			AB_len_squared = ABx**2 + ABy**2
 			if AB_len_squared == 0:
 				return
 			# Place each inner node perpendicularly on the average vector
-			for i in sequence["adjust"][1:-1]:
-				node = nodes[i]
+			for i in adjust[1:-1]:
 				# Node projection onto the vector
-				APx = node.x - sequence["node_from"].x
-				APy = node.y - sequence["node_from"].y
-				t = (APx*ABx + APy*ABy) / AB_len_squared
-				proj_x = sequence["node_from"].x + t * ABx
-				proj_y = sequence["node_from"].y + t * ABy
+				Px, Py = positions[i]
+				t = ((Px - Ax)*ABx + (Py - Ay)*ABy) / AB_len_squared
+				proj_x = Ax + t * ABx
+				proj_y = Ay + t * ABy
 				# Move node
+				node = nodes[i]
 				node.x = proj_x
 				node.y = proj_y
+				positions[i] = (node.x, node.y)
 	# --------------------------------------------------
 	# Remove inner redundant nodes (except two outer ones that are not in this list)
 	def remove_nodes(sequences):
@@ -184,12 +246,16 @@ def smooth_out_ripples(path):
 	# --------------------------------------------------
 	# Merge left two nodes into one and move it to the center of sequence
 	def merge_and_center_nodes(sequences):
+		# Index nodes once after removals
+		# Sequences don't overlap and are processed in reversed order
+		# So removals in later sequences don't shift indices of earlier ones
+		node_indices = {node: i for i, node in enumerate(nodes)}
 		# Process sequences in reversed order
 		for sequence in reversed(sequences):
 			n1 = sequence["node_from"]
 			n2 = sequence["node_to"]
-			i1 = nodes.index(n1)
-			i2 = nodes.index(n2)
+			i1 = node_indices[n1]
+			i2 = node_indices[n2]
 			if i2 - i1 < 3:
 				return
 			# Remove inner nodes manually
@@ -228,104 +294,105 @@ def smooth_out_ripples(path):
 # Remove tight nodes
 # Remove nodes that lies too close in range of distance and angle thresholds except smooth extremes
 def remove_tight_nodes(path):
-	threshold = TIGHT_NODES_THRESHOLD
+	# Distances are only compared with threshold, so squared values are enough
+	threshold_sq = TIGHT_NODES_THRESHOLD_SQ
 	nodes = path.nodes
+	# Protected nodes are kept by identity, so removals that shift indices don't affect them
 	protected_nodes = set()
 	# --------------------------------------------------
 	# Protect pass
 	# Collect protected nodes (smooth extremes + sharp turns of shape)
+	# Returns True if any node lies in threshold of its neighbour
 	def collect_protected_nodes():
-		path_length = len(nodes)
+		# Nodes are not changed in this pass, so geometry is read from snapshot
+		types, positions = snapshot_nodes(nodes)
+		path_length = len(types)
+		prev_on, next_on = on_curve_neighbors(types)
+		tight_found = False
 		for i in range(1, path_length - 1):
-			node = nodes[i]
-			if node.type == OFFCURVE:
+			if types[i] == OFFCURVE:
+				continue
+			node_x, node_y = positions[i]
+			# Find indices of previous/next on-curve nodes and handles
+			prev = prev_on[i]
+			next = next_on[i]
+			if prev is None or next is None:
 				continue
-			# Find previous/next on-curve nodes and handles
-			prev = None
-			next = None
 			prev_prev_handle = None
 			prev_next_handle = None
-			if i - 1 >= 0 and nodes[i - 1].type != OFFCURVE:
-				prev = nodes[i - 1]
-			elif i - 3 >= 0 and nodes[i - 3].type != OFFCURVE:
-				prev = nodes[i - 3]
-				if i - 4 >= 0 and nodes[i - 4].type == OFFCURVE:
-					prev_prev_handle = nodes[i - 4]
-				prev_next_handle = nodes[i - 2]
-			if i + 1 < path_length and nodes[i + 1].type != OFFCURVE:
-				next = nodes[i + 1]
-			elif i + 3 < path_length and nodes[i + 3].type != OFFCURVE:
-				next = nodes[i + 3]
-			if not (prev and next):
-				continue
-			# Distance between each on-curve pair
-			dist_prev = math.hypot(prev.x - node.x, prev.y - node.y)
-			dist_next = math.hypot(next.x - node.x, next.y - node.y)
-			if not (dist_prev < threshold or dist_next < threshold):
+			if prev == i - 3:
+				if i - 4 >= 0 and types[i - 4] == OFFCURVE:
+					prev_prev_handle = i - 4
+				prev_next_handle = i - 2
+			prev_x, prev_y = positions[prev]
+			next_x, next_y = positions[next]
+			# Squared distance between each on-curve pair
+			dist_prev_sq = (prev_x - node_x) * (prev_x - node_x) + (prev_y - node_y) * (prev_y - node_y)
+			dist_next_sq = (next_x - node_x) * (next_x - node_x) + (next_y - node_y) * (next_y - node_y)
+			if not (dist_prev_sq < threshold_sq or dist_next_sq < threshold_sq):
 				continue
+			tight_found = True
 			# --------------------------------------------------
 			# Smooth extreme protection
 			# Check if node has two handles
-			prev_handle = None
-			next_handle = None
-			if i - 1 >= 0 and nodes[i - 1].type == OFFCURVE:
-				prev_handle = nodes[i - 1]
-			if i + 1 < path_length and nodes[i + 1].type == OFFCURVE:
-				next_handle = nodes[i + 1]
-			if prev_handle is not None and next_handle is not None:
+			if types[i - 1] == OFFCURVE and types[i + 1] == OFFCURVE:
+				prev_handle_x, prev_handle_y = positions[i - 1]
+				next_handle_x, next_handle_y = positions[i + 1]
 				# Check if node is smooth extreme (node and both its handles lie on the same axis)
-				node_on_x_axis = prev_handle.y == node.y == next_handle.y
-				node_on_y_axis = prev_handle.x == node.x == next_handle.x
+				node_on_x_axis = prev_handle_y == node_y == next_handle_y
+				node_on_y_axis = prev_handle_x == node_x == next_handle_x
 				if node_on_x_axis or node_on_y_axis:
 					# Check if previous node also lies on the same axis
-					prev_match_on_x_axis = prev.y == node.y if prev is not prev_handle else False
-					prev_match_on_y_axis = prev.x == node.x if prev is not prev_handle else False
+					prev_match_on_x_axis = prev_y == node_y
+					prev_match_on_y_axis = prev_x == node_x
 					# Check if previous node handles are turned the same direction
 					prev_on_x_axis = False
 					prev_on_y_axis = False
 					if prev_prev_handle is not None and prev_next_handle is not None:
-						prev_on_x_axis = prev_prev_handle.y == prev.y == prev_next_handle.y
-						prev_on_y_axis = prev_prev_handle.x == prev.x == prev_next_handle.x
+						prev_on_x_axis = positions[prev_prev_handle][1] == prev_y == positions[prev_next_handle][1]
+						prev_on_y_axis = positions[prev_prev_handle][0] == prev_x == positions[prev_next_handle][0]
 					# Check if node not lies between its neighbors on another axis
 					# Protect only actual extreme on shape edge, not an intermediate on axis twist
 					node_is_extreme = True
 					if node_on_x_axis:
-						if min(prev.y, next.y) < node.y < max(prev.y, next.y):
+						if min(prev_y, next_y) < node_y < max(prev_y, next_y):
 							node_is_extreme = False
 					elif node_on_y_axis:
-						if min(prev.x, next.x) < node.x < max(prev.x, next.x):
+						if min(prev_x, next_x) < node_x < max(prev_x, next_x):
 							node_is_extreme = False
 					# Check if node is a first extreme on axis in a threshold range
 					# Protect only first extreme node on axis
 					first_extreme_on_axis = True
-					if dist_prev < threshold:
+					if dist_prev_sq < threshold_sq:
 						first_extreme_on_axis = (
 							(node_on_x_axis and not (prev_match_on_x_axis and prev_on_x_axis))
 							or
 							(node_on_y_axis and not (prev_match_on_y_axis and prev_on_y_axis))
 						)
 					# Do not protect pre-last extreme on a short last segment
-					if dist_next < threshold and next.index == path_length - 1:
+					if dist_next_sq < threshold_sq and next == path_length - 1:
 						first_extreme_on_axis = False
 					# Add node to protection set
 					if node_is_extreme and first_extreme_on_axis:
-						protected_nodes.add(node)
+						protected_nodes.add(nodes[i])
 						continue
 			# --------------------------------------------------
 			# Sharp turn of shape protection
 			# Node is not collapsed with a previous or next node
-			if dist_prev < 1 or dist_next < 1:
+			if dist_prev_sq < 1 or dist_next_sq < 1:
 				continue
-			dot = (prev.x - node.x) * (next.x - node.x) + (prev.y - node.y) * (next.y - node.y)
-			cos_angle = max(-1, min(1, dot / (dist_prev * dist_next)))
-			angle_deg = math.degrees(math.acos(cos_angle))
+			dot = (prev_x - node_x) * (next_x - node_x) + (prev_y - node_y) * (next_y - node_y)
+			# Actual lengths are needed only here, so square root is taken once for both
+			cos_angle = dot / math.sqrt(dist_prev_sq * dist_next_sq)
+			cos_angle = -1 if cos_angle < -1 else (1 if cos_angle > 1 else cos_angle)
 			# Add nodes in threshold to protection set
-			if angle_deg < TIGHT_NODES_TURNS_ANGLE:
-				if dist_prev < threshold:
-					protected_nodes.add(prev)
-				protected_nodes.add(node)
-				if dist_next < threshold:
-					protected_nodes.add(next)
+			if cos_angle > TIGHT_NODES_TURNS_COS:
+				if dist_prev_sq < threshold_sq:
+					protected_nodes.add(nodes[prev])
+				protected_nodes.add(nodes[i])
+				if dist_next_sq < threshold_sq:
+					protected_nodes.add(nodes[next])
+		return tight_found
 	# --------------------------------------------------
 	# Cleanup pass
 	# Check all nodes except first and last, in two passes
@@ -334,39 +401,49 @@ def remove_tight_nodes(path):
 		# Check actual length of nodes instead of path length
 		# Because each removal changes the path length
 		for i in reversed(range(1, len(nodes) - 1)):
+			# Nodes count is read once per node, it changes only after removal at the end of iteration
+			node_count = len(nodes)
 			node = nodes[i]
 			# Check on-curve nodes that are not protected
 			if node.type == OFFCURVE or node in protected_nodes:
 				continue
-			# Find previous/next on-curve neighbours
+			# Find indices of previous/next on-curve neighbours
 			prev = None
 			next = None
 			if i - 1 >= 0 and nodes[i - 1].type != OFFCURVE:
-				prev = nodes[i - 1]
+				prev = i - 1
 			elif i - 3 >= 0 and nodes[i - 3].type != OFFCURVE:
-				prev = nodes[i - 3]
-			if i + 1 < len(nodes) and nodes[i + 1].type != OFFCURVE:
-				next = nodes[i + 1]
-			elif i + 3 < len(nodes) and nodes[i + 3].type != OFFCURVE:
-				next = nodes[i + 3]
-			if not (prev and next):
+				prev = i - 3
+			if i + 1 < node_count and nodes[i + 1].type != OFFCURVE:
+				next = i + 1
+			elif i + 3 < node_count and nodes[i + 3].type != OFFCURVE:
+				next = i + 3
+			if prev is None or next is None:
 				continue
-			# Distance between each pair
-			dist_prev = math.hypot(prev.x - node.x, prev.y - node.y)
-			dist_next = math.hypot(next.x - node.x, next.y - node.y)
+			# Squared distance between each pair
+			node_x, node_y = node.x, node.y
+			prev_node = nodes[prev]
+			next_node = nodes[next]
+			prev_x, prev_y = prev_node.x, prev_node.y
+			next_x, next_y = next_node.x, next_node.y
+			dist_prev_sq = (prev_x - node_x) * (prev_x - node_x) + (prev_y - node_y) * (prev_y - node_y)
+			dist_next_sq = (next_x - node_x) * (next_x - node_x) + (next_y - node_y) * (next_y - node_y)
 			# Pass 1 — Check middle node in a triplet prev-node-next
 			if triplet:
-				if not (dist_prev < threshold and dist_next < threshold):
+				if not (dist_prev_sq < threshold_sq and dist_next_sq < threshold_sq):
 					continue
 			# Pass 2 — Check node in any pair prev-node or node-next
 			else:
-				if not (dist_prev < threshold or dist_next < threshold):
+				if not (dist_prev_sq < threshold_sq or dist_next_sq < threshold_sq):
 					continue
 			# Remove node
 			path.removeNodeCheckKeepShape_normalizeHandles_(node, True)
 	# --------------------------------------------------
 	# Pass 1 — Collect protected nodes
-	collect_protected_nodes()
+	# Cleanup passes only remove nodes in threshold of a neighbour
+	# So if there are no such nodes, nothing could be removed and path stays as is
+	if not collect_protected_nodes():
+		return
 	# Pass 2 — Remove middle node in tight triplets first
 	pass_cleanup(triplet=True)
 	# Pass 3 — Remove any node in tight duplets remained after the triplet pass
@@ -374,219 +451,249 @@ def remove_tight_nodes(path):
 
 
 
+# Cosine of angle between three nodes
+# Helpers are defined once at module level, so kernels don't recreate them on every call
+def cos_between_points(n1, subject, n2):
+	dir_n1 = (n1[0] - subject[0], n1[1] - subject[1])
+	dir_n2 = (n2[0] - subject[0], n2[1] - subject[1])
+	len_n1 = math.sqrt(dir_n1[0] * dir_n1[0] + dir_n1[1] * dir_n1[1])
+	len_n2 = math.sqrt(dir_n2[0] * dir_n2[0] + dir_n2[1] * dir_n2[1])
+	if len_n1 == 0 or len_n2 == 0:
+		return None
+	dot = dir_n1[0] * dir_n2[0] + dir_n1[1] * dir_n2[1]
+	cos = dot / (len_n1 * len_n2)
+	return -1 if cos < -1 else (1 if cos > 1 else cos)
+# --------------------------------------------------
+# Check if node/handle lies before the start of n1-n2 vector
+# Only the sign of cosine matters, so lengths are not needed
+def if_turned_backward(n1, subject, n2):
+	dir_segment = (n2[0] - n1[0], n2[1] - n1[1])
+	dir_subject = (subject[0] - n1[0], subject[1] - n1[1])
+	if dir_segment == (0, 0) or dir_subject == (0, 0):
+		return False
+	dot = dir_segment[0]*dir_subject[0] + dir_segment[1]*dir_subject[1]
+	return dot < 0
+# --------------------------------------------------
 # Fix degraded handles
-# Fix zero/turned-backward/rotated handles by pulling them out from node to inner side of segment
-def fix_degraded_handles(path):
-	# Check handle and find its best position
-	def check_handle(path, prev, opposite, node, handle, partner, next):
-		# Node naming map for 3 possible cases
-		# [prev - offcurve - opposite - node] [node - handle - partner - next] (curve-curve segments)
-		# [opposite - node] [node - handle - partner - next] (line-curve segments)
-		# [node - handle - partner - next] (curve segment, first or last on the path)
-		# --------------------------------------------------
-		# Angle between three nodes
-		def angle_between(n1, subject, n2):
-			dir_n1 = (n1.x - subject.x, n1.y - subject.y)
-			dir_n2 = (n2.x - subject.x, n2.y - subject.y)
-			len_n1 = math.hypot(*dir_n1)
-			len_n2 = math.hypot(*dir_n2)
-			if len_n1 == 0 or len_n2 == 0:
-				return None
-			dot = dir_n1[0] * dir_n2[0] + dir_n1[1] * dir_n2[1]
-			cos = max(-1, min(1, dot / (len_n1 * len_n2)))
-			return math.degrees(math.acos(cos))
-		# Check if node/handle lies before the start of n1-n2 vector
-		def if_turned_backward(n1, subject, n2):
-			dir_segment = (n2.x - n1.x, n2.y - n1.y)
-			dir_subject = (subject.x - n1.x, subject.y - n1.y)
-			len_segment = math.hypot(*dir_segment)
-			len_subject = math.hypot(*dir_subject)
-			if len_segment == 0 or len_subject == 0:
-				return False
-			dot = dir_segment[0]*dir_subject[0] + dir_segment[1]*dir_subject[1]
-			cos = dot / (len_segment * len_subject)
-			return cos < 0
-		# --------------------------------------------------
-		# Check if correction required
-		handle_length = math.hypot(handle.x - node.x, handle.y - node.y)
-		handle_turned_backward = if_turned_backward(node, handle, next)
-		handle_turned_to_opposite = False
-		handles_smooth = False
-		opposite_length = 0
-		opposite_turned_backward = False
-		opposite_isnot_on_segment = True
-		if opposite is not None:
-			opposite_length = math.hypot(node.x - opposite.x, node.y - opposite.y)
-			if not opposite_length < 1 and not handle_length < 1:
-				opposite_node_handle_angle = angle_between(opposite, node, handle)
-				tolerance = DEGRADED_HANDLE_ANGLE_TOLERANCE
-				# Check if handles are pointed in opposite direction (~180 degrees)
-				if 180 - opposite_node_handle_angle < tolerance:
-					handles_smooth = True
-				# Check if handle is turned to opposite handle (or previous node)
-				if opposite_node_handle_angle < tolerance and handle_turned_backward:
-					handle_turned_to_opposite = True
-			# Check if opposite is turned backward of its segment
-			if not opposite_length < 1 and prev is not None:
-				opposite_turned_backward = if_turned_backward(node, opposite, prev)
-			# Check if opposite is not turned forward to current segment
-			opposite_isnot_on_segment = if_turned_backward(node, opposite, next)
-		# Skip normal handles
-		if not (handle_length < 1 or handle_turned_backward or handle_turned_to_opposite):
-			return
-		# Skip if node is smooth, has correct opposed handles and opposite handle is normal
-		if node.smooth and handles_smooth and handle_turned_backward and not opposite_turned_backward:
-			return
-		# Distances
-		partner_length = math.hypot(partner.x - next.x, partner.y - next.y)
-		node_partner_length = math.hypot(partner.x - node.x, partner.y - node.y)
-		segment_length = math.hypot(next.x - node.x, next.y - node.y)
-		partner_is_within_segment = partner_length > 0 and partner_length < segment_length
-		# --------------------------------------------------
-		# Align handle with opposite handle (or previous node)
-		if node.smooth and opposite is not None:
-			if node_partner_length >= 2 and partner_is_within_segment:
-				# Target length is halfway to partner
-				target_length = max(DEGRADED_HANDLE_MIN_LENGTH, node_partner_length / 2)
-			else:
-				# Target length is 1/3 of segment length
-				target_length = max(DEGRADED_HANDLE_MIN_LENGTH, segment_length / 3)
-			# Get best vector
-			if opposite_length >= 1:
-				# From opposite handle (or previous node)
-				ux = (node.x - opposite.x) / opposite_length
-				uy = (node.y - opposite.y) / opposite_length
-			elif node_partner_length >= 1:
-				# From partner
-				ux = (partner.x - node.x) / node_partner_length
-				uy = (partner.y - node.y) / node_partner_length
-			elif segment_length >= 1:
-				# From segment
-				ux = (next.x - node.x) / segment_length
-				uy = (next.y - node.y) / segment_length
-			else:
-				# Can't find vector
-				return
-			# Check if handles are rotated or have a kink
-			handles_rotated = handle_turned_backward and not handle_turned_to_opposite
-			kink_backward = handle_length < 1 and not opposite_isnot_on_segment
-			# If so, reverse vector
-			if handles_rotated and (opposite is None or opposite_turned_backward):
-				ux = -ux
-				uy = -uy
-			elif kink_backward and (opposite is None or opposite_turned_backward):
-				ux = -ux
-				uy = -uy
-			# Place target length on vector
-			target_x = node.x + (ux * target_length)
-			target_y = node.y + (uy * target_length)
-		# --------------------------------------------------
-		# Align handle with partner handle
+# Find best position of handle from plain coordinates
+# Points are (x, y) tuples, prev and opposite could be None
+# Returns target position of handle, or None if handle doesn't need to change
+def degraded_handle_target(prev, opposite, node, smooth, handle, partner, next):
+	# Node naming map for 3 possible cases
+	# [prev - offcurve - opposite - node] [node - handle - partner - next] (curve-curve segments)
+	# [opposite - node] [node - handle - partner - next] (line-curve segments)
+	# [node - handle - partner - next] (curve segment, first or last on the path)
+	# --------------------------------------------------
+	# Check if correction required
+	# Handle length is only compared with threshold, so squared value is enough
+	handle_length_sq = (handle[0] - node[0]) * (handle[0] - node[0]) + (handle[1] - node[1]) * (handle[1] - node[1])
+	handle_turned_backward = if_turned_backward(node, handle, next)
+	handle_turned_to_opposite = False
+	handles_smooth = False
+	opposite_length = 0
+	opposite_turned_backward = False
+	opposite_isnot_on_segment = True
+	if opposite is not None:
+		opposite_dx, opposite_dy = node[0] - opposite[0], node[1] - opposite[1]
+		opposite_length = math.sqrt(opposite_dx * opposite_dx + opposite_dy * opposite_dy)
+		if not opposite_length < 1 and not handle_length_sq < 1:
+			opposite_node_handle_cos = cos_between_points(opposite, node, handle)
+			# Check if handles are pointed in opposite direction (~180 degrees)
+			if opposite_node_handle_cos < DEGRADED_HANDLE_OPPOSED_COS:
+				handles_smooth = True
+			# Check if handle is turned to opposite handle (or previous node)
+			if opposite_node_handle_cos > DEGRADED_HANDLE_ALIGNED_COS and handle_turned_backward:
+				handle_turned_to_opposite = True
+		# Check if opposite is turned backward of its segment
+		if not opposite_length < 1 and prev is not None:
+			opposite_turned_backward = if_turned_backward(node, opposite, prev)
+		# Check if opposite is not turned forward to current segment
+		opposite_isnot_on_segment = if_turned_backward(node, opposite, next)
+	# Skip normal handles
+	if not (handle_length_sq < 1 or handle_turned_backward or handle_turned_to_opposite):
+		return None
+	# Skip if node is smooth, has correct opposed handles and opposite handle is normal
+	if smooth and handles_smooth and handle_turned_backward and not opposite_turned_backward:
+		return None
+	# Distances
+	partner_dx, partner_dy = partner[0] - node[0], partner[1] - node[1]
+	segment_dx, segment_dy = next[0] - node[0], next[1] - node[1]
+	node_partner_length = math.sqrt(partner_dx * partner_dx + partner_dy * partner_dy)
+	segment_length = math.sqrt(segment_dx * segment_dx + segment_dy * segment_dy)
+	# Partner and segment lengths are only compared, so squared values are enough
+	partner_length_sq = (partner[0] - next[0]) * (partner[0] - next[0]) + (partner[1] - next[1]) * (partner[1] - next[1])
+	segment_length_sq = (next[0] - node[0]) * (next[0] - node[0]) + (next[1] - node[1]) * (next[1] - node[1])
+	partner_is_within_segment = partner_length_sq > 0 and partner_length_sq < segment_length_sq
+	# --------------------------------------------------
+	# Align handle with opposite handle (or previous node)
+	if smooth and opposite is not None:
+		if node_partner_length >= 2 and partner_is_within_segment:
+			# Target length is halfway to partner
+			target_length = max(DEGRADED_HANDLE_MIN_LENGTH, node_partner_length / 2)
+		else:
+			# Target length is 1/3 of segment length
+			target_length = max(DEGRADED_HANDLE_MIN_LENGTH, segment_length / 3)
+		# Get best vector
+		if opposite_length >= 1:
+			# From opposite handle (or previous node)
+			inv_length = 1.0 / opposite_length
+			ux = (node[0] - opposite[0]) * inv_length
+			uy = (node[1] - opposite[1]) * inv_length
+		elif node_partner_length >= 1:
+			# From partner
+			inv_length = 1.0 / node_partner_length
+			ux = (partner[0] - node[0]) * inv_length
+			uy = (partner[1] - node[1]) * inv_length
+		elif segment_length >= 1:
+			# From segment
+			inv_length = 1.0 / segment_length
+			ux = (next[0] - node[0]) * inv_length
+			uy = (next[1] - node[1]) * inv_length
+		else:
+			# Can't find vector
+			return None
+		# Check if handles are rotated or have a kink
+		handles_rotated = handle_turned_backward and not handle_turned_to_opposite
+		kink_backward = handle_length_sq < 1 and not opposite_isnot_on_segment
+		# If so, reverse vector
+		if handles_rotated and (opposite is None or opposite_turned_backward):
+			ux = -ux
+			uy = -uy
+		elif kink_backward and (opposite is None or opposite_turned_backward):
+			ux = -ux
+			uy = -uy
+		# Place target length on vector
+		target_x = node[0] + (ux * target_length)
+		target_y = node[1] + (uy * target_length)
+	# --------------------------------------------------
+	# Align handle with partner handle
+	else:
+		if node_partner_length >= 2 and partner_is_within_segment:
+			# Target is halfway to partner handle
+			target_x = node[0] + ((partner[0] - node[0]) / 2)
+			target_y = node[1] + ((partner[1] - node[1]) / 2)
+		elif 2 > node_partner_length >= 1 and partner_is_within_segment:
+			# Target is partner
+			target_x = partner[0]
+			target_y = partner[1]
 		else:
-			if node_partner_length >= 2 and partner_is_within_segment:
-				# Target is halfway to partner handle
-				target_x = node.x + ((partner.x - node.x) / 2)
-				target_y = node.y + ((partner.y - node.y) / 2)
-			elif 2 > node_partner_length >= 1 and partner_is_within_segment:
-				# Target is partner
-				target_x = partner.x
-				target_y = partner.y
+			# Target is 1/3 to next node
+			if segment_length >= 3:
+				target_x = node[0] + ((next[0] - node[0]) / 3)
+				target_y = node[1] + ((next[1] - node[1]) / 3)
+			# Target is halfway to next node
+			elif segment_length >= 2:
+				target_x = node[0] + ((next[0] - node[0]) / 2)
+				target_y = node[1] + ((next[1] - node[1]) / 2)
+			# Target is next node
 			else:
-				# Target is 1/3 to next node
-				if segment_length >= 3:
-					target_x = node.x + ((next.x - node.x) / 3)
-					target_y = node.y + ((next.y - node.y) / 3)
-				# Target is halfway to next node
-				elif segment_length >= 2:
-					target_x = node.x + ((next.x - node.x) / 2)
-					target_y = node.y + ((next.y - node.y) / 2)
-				# Target is next node
-				else:
-					target_x = next.x
-					target_y = next.y
-		# --------------------------------------------------
-		# Move handle
-		handle.x, handle.y = target_x, target_y
+				target_x = next[0]
+				target_y = next[1]
+	# --------------------------------------------------
+	return target_x, target_y
+
+
+
+# Fix degraded handles
+# Fix zero/turned-backward/rotated handles by pulling them out from node to inner side of segment
+def fix_degraded_handles(path):
+	nodes = list(path.nodes)
+	path_length = len(nodes)
+	types, positions = snapshot_nodes(nodes)
+	prev_on, next_on = on_curve_neighbors(types)
+	# Check handle and move it to its best position
+	# Arguments are node indices, moved handle is written to both node and snapshot
+	def check_handle(prev, opposite, node, handle, partner, next):
+		target = degraded_handle_target(
+			positions[prev] if prev is not None else None,
+			positions[opposite] if opposite is not None else None,
+			positions[node],
+			nodes[node].smooth,
+			positions[handle],
+			positions[partner],
+			positions[next],
+		)
+		if target is not None:
+			moved = nodes[handle]
+			moved.x, moved.y = target
+			positions[handle] = (moved.x, moved.y)
 	# --------------------------------------------------
 	# Check all on-curve nodes and its handles from both sides
-	path_length = len(path.nodes)
 	for i in range(path_length):
-		node = path.nodes[i]
 		# Start from on-curve node
-		if node.type != OFFCURVE:
+		if types[i] != OFFCURVE:
 			# Check the previous handle
-			if i-3 >= 0 and path.nodes[i-1].type == OFFCURVE:
+			if i-3 >= 0 and types[i-1] == OFFCURVE:
 				prev = None
 				opposite = None
 				if i+1 < path_length:
-					opposite = path.nodes[i+1]
-					if opposite.type == OFFCURVE:
-						if i+3 < path_length and path.nodes[i+3].type != OFFCURVE:
-							prev = path.nodes[i+3]
-				handle = path.nodes[i-1]
-				partner = path.nodes[i-2]
-				next = path.nodes[i-3]
-				check_handle(path, prev, opposite, node, handle, partner, next)
+					opposite = i+1
+					if types[opposite] == OFFCURVE:
+						prev = next_on[i]
+				check_handle(prev, opposite, i, i-1, i-2, i-3)
 			# Check the next handle
-			if i+3 < path_length and path.nodes[i+1].type == OFFCURVE:
+			if i+3 < path_length and types[i+1] == OFFCURVE:
 				prev = None
 				opposite = None
 				if i-1 >= 0:
-					opposite = path.nodes[i-1]
-					if opposite.type == OFFCURVE:
-						if i-3 >= 0 and path.nodes[i-3].type != OFFCURVE:
-							prev = path.nodes[i-3]
-				handle = path.nodes[i+1]
-				partner = path.nodes[i+2]
-				next = path.nodes[i+3]
-				check_handle(path, prev, opposite, node, handle, partner, next)
+					opposite = i-1
+					if types[opposite] == OFFCURVE:
+						prev = prev_on[i]
+				check_handle(prev, opposite, i, i+1, i+2, i+3)
 
 
 
+# Intersection point of two vectors, each given by start point and direction
+# Parametric form works with differences relative to first node
+# So it keeps precision for nearly parallel vectors or coordinates far from origin
+def intersection_of_vectors(n1x, n1y, v1x, v1y, n2x, n2y, v2x, v2y):
+	det = v1x * v2y - v1y * v2x
+	if det == 0:
+		return None
+	# Position of intersection along first vector
+	t = ((n2x - n1x) * v2y - (n2y - n1y) * v2x) / det
+	return (n1x + t * v1x, n1y + t * v1y)
+# --------------------------------------------------
 # Shorten handles that have a loop (double intersection) or inflection (single intersection)
-# Shorten handles on curve segment
-def shorten_inflected_handles_on_segment(n1, h1, h2, n2):
+# Find new handles positions of curve segment from plain coordinates
+# Returns target position for each handle, or None if handle doesn't need to change
+# Minimal length of handles shortened by intersection could be passed, otherwise it depends on segment length
+def inflected_handles_targets(n1x, n1y, h1x, h1y, h2x, h2y, n2x, n2y, min_length=None):
+	# Bind math function to local name
+	sqrt = math.sqrt
+	# Handles vectors from their nodes
+	v1x, v1y = h1x - n1x, h1y - n1y
+	v2x, v2y = h2x - n2x, h2y - n2y
 	# Skip segments with collapsed nodes or zero handles
-	seg_len = math.hypot(n2.x - n1.x, n2.y - n1.y)
-	h1_len = math.hypot(h1.x - n1.x, h1.y - n1.y)
-	h2_len = math.hypot(h2.x - n2.x, h2.y - n2.y)
+	seg_len = sqrt((n2x - n1x) * (n2x - n1x) + (n2y - n1y) * (n2y - n1y))
+	h1_len = sqrt(v1x * v1x + v1y * v1y)
+	h2_len = sqrt(v2x * v2x + v2y * v2y)
 	if seg_len == 0 or h1_len == 0 or h2_len == 0:
-		return
+		return None, None
+	h1_target = None
+	h2_target = None
 	# --------------------------------------------------
 	# Intersection case
 	# Check inflection (single intersection)
 	# Check loop (double intersection)
-	def intersection_of_vectors(n1, h1, n2, h2):
-		x1, y1 = n1.x, n1.y
-		x2, y2 = h1.x, h1.y
-		x3, y3 = n2.x, n2.y
-		x4, y4 = h2.x, h2.y
-		det = (x1 - x2) * (y3 - y4) - (y1 - y2) * (x3 - x4)
-		if det == 0:
-			return None
-		px = ((x1 * y2 - y1 * x2) * (x3 - x4) - (x1 - x2) * (x3 * y4 - y3 * x4)) / det
-		py = ((x1 * y2 - y1 * x2) * (y3 - y4) - (y1 - y2) * (x3 * y4 - y3 * x4)) / det
-		return (px, py)
-	interpoint = intersection_of_vectors(n1, h1, n2, h2)
+	interpoint = intersection_of_vectors(n1x, n1y, v1x, v1y, n2x, n2y, v2x, v2y)
 	intersection = False
 	dist1 = dist2 = None
 	if interpoint is not None:
 		# Check if both handles tips are exactly in the same coordinate
-		if (h1.x, h1.y) == (h2.x, h2.y):
+		if (h1x, h1y) == (h2x, h2y):
 			intersection = True
 			dist1 = max(0, h1_len - INFLECTION_BUFFER)
 			dist2 = max(0, h2_len - INFLECTION_BUFFER)
 		else:
 			# Check vectors and distances
-			v1_to_inter = (interpoint[0] - n1.x, interpoint[1] - n1.y)
-			v2_to_inter = (interpoint[0] - n2.x, interpoint[1] - n2.y)
-			v1_dir = (h1.x - n1.x, h1.y - n1.y)
-			v2_dir = (h2.x - n2.x, h2.y - n2.y)
+			v1_to_inter = (interpoint[0] - n1x, interpoint[1] - n1y)
+			v2_to_inter = (interpoint[0] - n2x, interpoint[1] - n2y)
 			# Check if intersection is on front side (between nodes)
-			dist1 = max(0, math.hypot(v1_to_inter[0], v1_to_inter[1]) - INFLECTION_BUFFER)
-			dist2 = max(0, math.hypot(v2_to_inter[0], v2_to_inter[1]) - INFLECTION_BUFFER)
-			dot1 = v1_to_inter[0]*v1_dir[0] + v1_to_inter[1]*v1_dir[1]
-			dot2 = v2_to_inter[0]*v2_dir[0] + v2_to_inter[1]*v2_dir[1]
+			dist1 = max(0, sqrt(v1_to_inter[0] * v1_to_inter[0] + v1_to_inter[1] * v1_to_inter[1]) - INFLECTION_BUFFER)
+			dist2 = max(0, sqrt(v2_to_inter[0] * v2_to_inter[0] + v2_to_inter[1] * v2_to_inter[1]) - INFLECTION_BUFFER)
+			dot1 = v1_to_inter[0]*v1x + v1_to_inter[1]*v1y
+			dot2 = v2_to_inter[0]*v2x + v2_to_inter[1]*v2y
 			# Check if at least one handle overshot the vector of other handle
 			# Skip the case when handle tip lies on vector of other handle but not overshot it
 			if (dot1 > 0 and dot2 > 0) and ((dist1 + INFLECTION_BUFFER) < h1_len or (dist2 + INFLECTION_BUFFER) < h2_len):
@@ -596,37 +703,37 @@ def shorten_inflected_handles_on_segment(n1, h1, h2, n2):
 		# Calculate minimal handle length dynamically depending of segment length
 		# Like 1/5 of segment length but not shorter than a constant
 		# This helps to avoid kinks after shortening
-		min_length = max(seg_len / 5, INFLECTION_HANDLE_MIN_LENGTH)
+		if min_length is None:
+			min_length = max(seg_len / 5, INFLECTION_HANDLE_MIN_LENGTH)
 		# Shorten handles that go beyond intersection point
-		def shorten_handle(node, handle, length, min_length, distance):
-			if length != 0:
-				new_length = max(distance, min_length)
-				target_x = node.x + (((handle.x - node.x) / length) * new_length)
-				target_y = node.y + (((handle.y - node.y) / length) * new_length)
-				handle.x, handle.y = target_x, target_y
+		def shorten_handle(node_x, node_y, handle_x, handle_y, length, min_length, distance):
+			# Scale factor is shared by both coordinates
+			scale = max(distance, min_length) / length
+			target_x = node_x + ((handle_x - node_x) * scale)
+			target_y = node_y + ((handle_y - node_y) * scale)
+			return target_x, target_y
 		# Check first handle
 		if dist1 < h1_len > min_length:
-			shorten_handle(n1, h1, h1_len, min_length, dist1)
+			h1_target = shorten_handle(n1x, n1y, h1x, h1y, h1_len, min_length, dist1)
 		# Check second handle
 		if dist2 < h2_len > min_length:
-			shorten_handle(n2, h2, h2_len, min_length, dist2)
+			h2_target = shorten_handle(n2x, n2y, h2x, h2y, h2_len, min_length, dist2)
 	# --------------------------------------------------
 	# No intersection case
 	# Check S-like inflection (almost parallel handles turned towards each other)
 	else:
 		# Find angle between handles
-		v1x, v1y = h1.x - n1.x, h1.y - n1.y
-		v2x, v2y = h2.x - n2.x, h2.y - n2.y
 		dot = v1x * v2x + v1y * v2y
-		cos_angle = max(-1, min(1, dot / (h1_len * h2_len)))
-		angle_deg = math.degrees(math.acos(cos_angle))
+		cos_angle = dot / (h1_len * h2_len)
+		cos_angle = -1 if cos_angle < -1 else (1 if cos_angle > 1 else cos_angle)
 		# Detect handles pointing nearly opposite
-		if angle_deg > INFLECTION_S_MIN_ANGLE:
+		if cos_angle < INFLECTION_S_MIN_COS:
 			# Calculate distances
-			h1_n1 = math.hypot(h1.x - n1.x, h1.y - n1.y)
-			h2_n1 = math.hypot(h2.x - n1.x, h2.y - n1.y)
-			h1_n2 = math.hypot(h1.x - n2.x, h1.y - n2.y)
-			h2_n2 = math.hypot(h2.x - n2.x, h2.y - n2.y)
+			# Distances of handles to their own nodes are handles lengths
+			h1_n1 = h1_len
+			h2_n1 = sqrt((h2x - n1x) * (h2x - n1x) + (h2y - n1y) * (h2y - n1y))
+			h1_n2 = sqrt((h1x - n2x) * (h1x - n2x) + (h1y - n2y) * (h1y - n2y))
+			h2_n2 = h2_len
 			# Threshold for ignoring equal distances
 			THRESHOLD = 1.0
 			# Check if handles are closer to their own nodes
@@ -634,17 +741,18 @@ def shorten_inflected_handles_on_segment(n1, h1, h2, n2):
 			h2_closer_to_own = (h2_n2 - THRESHOLD) < h1_n2
 			if not h1_closer_to_own or not h2_closer_to_own:
 				# Get segment vector
-				ux, uy = (n2.x - n1.x) / seg_len, (n2.y - n1.y) / seg_len
+				inv_seg_len = 1.0 / seg_len
+				ux, uy = (n2x - n1x) * inv_seg_len, (n2y - n1y) * inv_seg_len
 				# Project each handle onto n1-n2 axis
 				def project_along_segment(px, py):
-					return (px - n1.x) * ux + (py - n1.y) * uy
+					return (px - n1x) * ux + (py - n1y) * uy
 				n1_pos = 0
 				n2_pos = seg_len
-				h1_pos = project_along_segment(h1.x, h1.y)
-				h2_pos = project_along_segment(h2.x, h2.y)
+				h1_pos = project_along_segment(h1x, h1y)
+				h2_pos = project_along_segment(h2x, h2y)
 				# Project midpoint between handles onto n1-n2 axis
-				mid_x = (h1.x + h2.x) / 2.0
-				mid_y = (h1.y + h2.y) / 2.0
+				mid_x = (h1x + h2x) / 2.0
+				mid_y = (h1y + h2y) / 2.0
 				mid_pos = project_along_segment(mid_x, mid_y)
 				# New handles lengths (could be positive or negative at this step)
 				h1_new_len = mid_pos - n1_pos
@@ -665,28 +773,45 @@ def shorten_inflected_handles_on_segment(n1, h1, h2, n2):
 				# Protect the handles from being zero width or falling behind its node
 				h1_new_len = max(h1_new_len, INFLECTION_HANDLE_MIN_LENGTH)
 				h2_new_len = max(h2_new_len, INFLECTION_HANDLE_MIN_LENGTH)
-				# Adjust handles
-				h1.x = n1.x + ((v1x / h1_len) * h1_new_len)
-				h1.y = n1.y + ((v1y / h1_len) * h1_new_len)
-				h2.x = n2.x + ((v2x / h2_len) * h2_new_len)
-				h2.y = n2.y + ((v2y / h2_len) * h2_new_len)
+				# Adjusted handles
+				# Each handle keeps its direction, so one scale factor per handle is enough
+				h1_scale = h1_new_len / h1_len
+				h2_scale = h2_new_len / h2_len
+				h1_target = (n1x + (v1x * h1_scale), n1y + (v1y * h1_scale))
+				h2_target = (n2x + (v2x * h2_scale), n2y + (v2y * h2_scale))
+	return h1_target, h2_target
+# --------------------------------------------------
+# Shorten handles on curve segment
+# Node positions are read once, and only changed handles are written back
+def shorten_inflected_handles_on_segment(n1, h1, h2, n2):
+	h1_target, h2_target = inflected_handles_targets(n1.x, n1.y, h1.x, h1.y, h2.x, h2.y, n2.x, n2.y)
+	if h1_target is not None:
+		h1.x, h1.y = h1_target
+	if h2_target is not None:
+		h2.x, h2.y = h2_target
 # --------------------------------------------------
 # Shorten handles on path, segment by segment
 def shorten_inflected_handles(path):
-	path_length = len(path.nodes)
+	nodes = list(path.nodes)
+	path_length = len(nodes)
 	if path_length < 4:
 		return
+	# Read types and positions of all nodes in one pass
+	types, positions = snapshot_nodes(nodes)
 	for i in range(path_length):
 		if i < 3:
 			continue
-		if path.nodes[i].type != CURVE:
+		if types[i] != CURVE:
 			continue
 		# Check each curve segment
-		n1 = path.nodes[i-3]
-		h1 = path.nodes[i-2]
-		h2 = path.nodes[i-1]
-		n2 = path.nodes[i]
-		shorten_inflected_handles_on_segment(n1, h1, h2, n2)
+		(n1x, n1y), (h1x, h1y), (h2x, h2y), (n2x, n2y) = positions[i-3:i+1]
+		h1_target, h2_target = inflected_handles_targets(n1x, n1y, h1x, h1y, h2x, h2y, n2x, n2y)
+		# Write back only changed handles, and keep saved positions in sync with them
+		for k, target in ((i-2, h1_target), (i-1, h2_target)):
+			if target is not None:
+				handle = nodes[k]
+				handle.x, handle.y = target
+				positions[k] = (handle.x, handle.y)
 
 
 
@@ -16,11 +16,11 @@ from AppKit import (
 	NSAttributedString, NSFont, NSFontAttributeName, NSForegroundColorAttributeName,
 	NSBezierPath, NSPoint, NSColor,
 )
-from Foundation import NSTimer
+from Foundation import NSObject
 import time
 
 from SimplifyPath import simplify_path
-from RedrawPath import identify_closest_area, redraw_path
+from RedrawPath import identify_closest_area, redraw_path, clear_segments_cache, cached_path_fingerprint
 
 __doc__ = """
 Simplify Path — drawing with the Pencil tool produces a smooth path by removing tight nodes, smoothing ripples, and fixing degraded or inflected handles.
@@ -28,6 +28,29 @@ Redraw Path — hold Option ⌥ while drawing with the Pencil tool to merge draw
 Draw Closed Path — hold Shift ⇧ while drawing with the Pencil tool to automatically close drawn path.
 """
 
+# Tool names checked to detect that Pencil tool is active
+PENCIL_TOOLS = frozenset(("PenTool", "GSToolGroup"))
+
+# Append quadratic run to Bezier path as cubic segments, converted from plain coordinates
+# Implied on-curve points lie in the middle between each two handles
+# NSPoint is created only for points passed to Bezier path
+def quadratic_to_cubic(shade_path, start_pos, intermediate, end_pos):
+	prev_x, prev_y = start_pos.x, start_pos.y
+	handles = [(p.x, p.y) for p in intermediate]
+	last = len(handles) - 1
+	for i, (cp_x, cp_y) in enumerate(handles):
+		if i == last:
+			to_x, to_y = end_pos.x, end_pos.y
+			to_point = end_pos
+		else:
+			next_x, next_y = handles[i+1]
+			to_x, to_y = (cp_x + next_x)/2.0, (cp_y + next_y)/2.0
+			to_point = NSPoint(to_x, to_y)
+		c1 = NSPoint(prev_x + 2/3*(cp_x - prev_x), prev_y + 2/3*(cp_y - prev_y))
+		c2 = NSPoint(to_x + 2/3*(cp_x - to_x), to_y + 2/3*(cp_y - to_y))
+		shade_path.curveToPoint_controlPoint1_controlPoint2_(to_point, c1, c2)
+		prev_x, prev_y = to_x, to_y
+
 class PencilModifier(GeneralPlugin):
 	
 	@objc.python_method
@@ -43,20 +66,34 @@ class PencilModifier(GeneralPlugin):
 			"AdjustConnections": True,
 			"CorrectPathDirection": True,
 		}
+		# Settings states mirrored as attributes (like settingShadeTheArea) for mouse and draw callbacks
+		for settingsKey, stateBool in self.SETTINGS.items():
+			setattr(self, f"setting{settingsKey}", stateBool)
 		# Current states
 		self.PencilIsActive = False
 		self.OptionIsLocked = False
 		self.OptionIsHeld = False
 		self.ShiftIsHeld = False
+		self.ShadeIsActive = False
 		self.undoManager = None
-		self.getPathTimer = None
+		self.getPathIsPending = False
 		self.getPathDelay = 0.025
 		self.mousePosition = None
 		self.mousePositionStart = None
 		self.closestPath = None
 		self.closestArea = None
+		self.dragView = None
+		self.dragPaths = None
+		self.shadeCacheKey = None
+		self.shadeCachePath = None
 		self.ShadeTheAreaTimestamp = 0
 		self.ShadeTheAreaInterval = 0.05
+		self.redrawTimestamp = 0
+		self.redrawInterval = 1 / 60.0
+		# Shade the area stroke colors for light and dark canvas
+		strokeOpacity = 0.8
+		self.shadeColorLight = NSColor.colorWithString_("#FFFFFF").colorWithAlphaComponent_(strokeOpacity)
+		self.shadeColorDark = NSColor.colorWithString_("#0d0d0d").colorWithAlphaComponent_(strokeOpacity)
 	
 	def start(self):
 		# Build submenu
@@ -77,11 +114,15 @@ class PencilModifier(GeneralPlugin):
 			)
 			item.setState_(NSOnState if stateBool else NSOffState)
 			self.SETTINGS[settingsKey] = stateBool
+			setattr(self, f"setting{settingsKey}", stateBool)
 			setattr(self, f"menu{settingsKey}", item)
+			self.settingsMenuItems[settingsKey] = item
 			submenu.addItem_(item)
 		def addMenuSeparator():
 			submenu.addItem_(NSMenuItem.separatorItem())
 		submenu = NSMenu.alloc().initWithTitle_(self.menuName)
+		# Menu item of each setting, by settings key
+		self.settingsMenuItems = {}
 		addMenuItem("Enable Plugin", "togglePlugin:", "Enabled")
 		addMenuItem("Simplify Drawn Path", "updateSimplifyPath:", "SimplifyPath")
 		addMenuSeparator()
@@ -91,6 +132,8 @@ class PencilModifier(GeneralPlugin):
 		addMenuSeparator()
 		addMenuHeader("Draw Closed Path\t\t\tPencil ⇧")
 		addMenuItem("Correct Path Direction", "updateCorrectPathDirection:", "CorrectPathDirection")
+		# Items with actions, all other items are headers and separators
+		self.toggleMenuItems = set(self.settingsMenuItems.values())
 		menuEntry = NSMenuItem.alloc().initWithTitle_action_keyEquivalent_(self.menuName, None, "")
 		menuEntry.setSubmenu_(submenu)
 		Glyphs.menu[PATH_MENU].append(menuEntry)
@@ -99,23 +142,12 @@ class PencilModifier(GeneralPlugin):
 			self.activate()
 		else:
 			self.deactivate()
-		# Update current state if Option is held
-		def flagsChangedHandler_(event):
-			state = (event.modifierFlags() & NSEventModifierFlagOption) == NSEventModifierFlagOption
-			if self.PencilIsActive and not self.OptionIsLocked:
-				self.OptionIsHeld = state
-				if self.SETTINGS["ShadeTheArea"]:
-					self.redrawEditView()
-			return event
-		if not hasattr(self, "_flagsChangedMonitor"):
-			self._flagsChangedMonitor = NSEvent.addLocalMonitorForEventsMatchingMask_handler_(
-				NSEventMaskFlagsChanged, flagsChangedHandler_
-			)
 	
 	# Menu actions
 	# Main toggler to enable/disable the plugin
 	def togglePlugin_(self, sender):
 		self.SETTINGS["Enabled"] = not self.SETTINGS.get("Enabled", False)
+		self.settingEnabled = self.SETTINGS["Enabled"]
 		if self.SETTINGS["Enabled"]:
 			self.activate()
 			self.menuEnabled.setState_(NSOnState)
@@ -125,30 +157,29 @@ class PencilModifier(GeneralPlugin):
 		Glyphs.defaults[f"{self.DEFAULTS}.Enabled"] = self.SETTINGS["Enabled"]
 	# When plugin is disabled, gray out submenu items except main toggler and headers/separators
 	def validateMenuItem_(self, menuItem):
-		if not menuItem.action():
+		if menuItem not in self.toggleMenuItems:
 			return False
-		if not self.SETTINGS.get("Enabled", False):
-			if menuItem != self.menuEnabled:
-				return False
-		return True
-	# Toggle menu item and update SETTINGS and user defaults
+		return self.settingEnabled or menuItem is self.menuEnabled
+	# Toggle menu item and update SETTINGS, its attribute and user defaults
 	@objc.python_method
-	def toggleMenuItemState(self, attrName, settingsKey):
-		item = getattr(self, attrName)
+	def toggleMenuItemState(self, settingsKey):
+		item = self.settingsMenuItems[settingsKey]
 		state = NSOffState if item.state() == NSOnState else NSOnState
 		item.setState_(state)
 		stateBool = (state == NSOnState)
 		self.SETTINGS[settingsKey] = stateBool
+		setattr(self, f"setting{settingsKey}", stateBool)
 		Glyphs.defaults[f"{self.DEFAULTS}.{settingsKey}"] = stateBool
+		self.updateShadeIsActive()
 	# Actions for plugin settings items
 	def updateSimplifyPath_(self, sender):
-		self.toggleMenuItemState("menuSimplifyPath", "SimplifyPath")
+		self.toggleMenuItemState("SimplifyPath")
 	def updateShadeTheArea_(self, sender):
-		self.toggleMenuItemState("menuShadeTheArea", "ShadeTheArea")
+		self.toggleMenuItemState("ShadeTheArea")
 	def updateAdjustConnections_(self, sender):
-		self.toggleMenuItemState("menuAdjustConnections", "AdjustConnections")
+		self.toggleMenuItemState("AdjustConnections")
 	def updateCorrectPathDirection_(self, sender):
-		self.toggleMenuItemState("menuCorrectPathDirection", "CorrectPathDirection")
+		self.toggleMenuItemState("CorrectPathDirection")
 	
 	# Start watching when plugin is actived
 	def activate(self):
@@ -157,6 +188,20 @@ class PencilModifier(GeneralPlugin):
 		Glyphs.addCallback(self.handleMouseDown, MOUSEDOWN)
 		Glyphs.addCallback(self.handleMouseUp, MOUSEUP)
 		Glyphs.addCallback(self.drawForeground, DRAWFOREGROUND)
+		# Update current state if Option is held
+		# Monitor is installed only while plugin is active, so modifier keys aren't watched when it is disabled
+		def flagsChangedHandler_(event):
+			state = (event.modifierFlags() & NSEventModifierFlagOption) == NSEventModifierFlagOption
+			if self.PencilIsActive and not self.OptionIsLocked:
+				self.OptionIsHeld = state
+				self.updateShadeIsActive()
+				if self.settingShadeTheArea:
+					self.redrawEditView()
+			return event
+		if getattr(self, "_flagsChangedMonitor", None) is None:
+			self._flagsChangedMonitor = NSEvent.addLocalMonitorForEventsMatchingMask_handler_(
+				NSEventMaskFlagsChanged, flagsChangedHandler_
+			)
 	# Stop watching when plugin is deactivated
 	def deactivate(self):
 		Glyphs.removeCallback(self.handleMouseMoved, MOUSEMOVED)
@@ -164,20 +209,24 @@ class PencilModifier(GeneralPlugin):
 		Glyphs.removeCallback(self.handleMouseDown, MOUSEDOWN)
 		Glyphs.removeCallback(self.handleMouseUp, MOUSEUP)
 		Glyphs.removeCallback(self.drawForeground, DRAWFOREGROUND)
+		if getattr(self, "_flagsChangedMonitor", None) is not None:
+			NSEvent.removeMonitor_(self._flagsChangedMonitor)
+			self._flagsChangedMonitor = None
 		# Clear current states
 		self.clearStates()
+		clear_segments_cache()
 		if self.undoManager is not None:
 			try:
 				self.undoManager.endUndoGrouping()
 			except Exception:
 				pass
 			self.undoManager = None
-		if self.getPathTimer is not None:
+		if self.getPathIsPending:
 			try:
-				self.getPathTimer.invalidate()
+				NSObject.cancelPreviousPerformRequestsWithTarget_(self)
 			except Exception:
 				pass
-			self.getPathTimer = None
+			self.getPathIsPending = False
 	
 	# Clear current states
 	def clearStates(self):
@@ -185,41 +234,67 @@ class PencilModifier(GeneralPlugin):
 		self.OptionIsLocked = False
 		self.OptionIsHeld = False
 		self.ShiftIsHeld = False
+		self.ShadeIsActive = False
 		self.mousePosition = None
 		self.mousePositionStart = None
 		self.closestPath = None
 		self.closestArea = None
+		self.dragView = None
+		self.dragPaths = None
+		self.shadeCacheKey = None
+		self.shadeCachePath = None
+	
+	# Shade the area only while Pencil is active, Option is held and mouse position is known
+	# Saved as one flag, so every foreground redraw while editing is rejected by a single check
+	@objc.python_method
+	def updateShadeIsActive(self):
+		self.ShadeIsActive = bool(
+			self.settingShadeTheArea and self.PencilIsActive and self.OptionIsHeld and self.mousePosition is not None
+		)
 	
 	# Mouse Moved event
 	@objc.python_method
 	def handleMouseMoved(self, notification):
+		font = Glyphs.font
 		# Check if Pencil tool is active
-		if Glyphs.font.tool not in ("PenTool", "GSToolGroup"):
+		if font.tool not in PENCIL_TOOLS:
 			if self.PencilIsActive:
 				# Clear current states
 				self.clearStates()
-				if self.SETTINGS["ShadeTheArea"]:
+				if self.settingShadeTheArea:
 					self.redrawEditView()
 			return
 		self.PencilIsActive = True
 		# Save mouse cursor position in Edit View
-		if self.SETTINGS["ShadeTheArea"]:
-			tab = Glyphs.font.currentTab
-			view = tab.graphicView() if tab else None
+		if self.settingShadeTheArea:
+			# View can't change while the mouse is dragged, so view found on mouse down is reused
+			view = self.dragView
+			if view is None:
+				tab = font.currentTab
+				view = tab.graphicView() if tab else None
 			event = Glyphs.currentEvent() if view else None
 			if event:
+				# Position is saved even without Option, so the area is shaded right away once Option is held
 				self.mousePosition = view.getActiveLocation_(event)
-				self.redrawEditView()
+				# Option state is also taken from mouse event, in case it was changed while Pencil wasn't active
+				OptionWasHeld = self.OptionIsHeld
+				if not self.OptionIsLocked:
+					self.OptionIsHeld = bool(event.modifierFlags() & NSEventModifierFlagOption)
+				self.updateShadeIsActive()
+				# Area is not shaded without Option, so there is nothing to redraw
+				if self.OptionIsHeld or OptionWasHeld:
+					self.redrawEditViewThrottled()
 	
 	# Mouse Down event
 	@objc.python_method
 	def handleMouseDown(self, notification):
+		font = Glyphs.font
 		# Check if Pencil tool is active
-		if Glyphs.font.tool not in ("PenTool", "GSToolGroup"):
+		if font.tool not in PENCIL_TOOLS:
 			if self.PencilIsActive:
 				# Clear current states
 				self.clearStates()
-				if self.SETTINGS["ShadeTheArea"]:
+				if self.settingShadeTheArea:
 					self.redrawEditView()
 			return
 		self.PencilIsActive = True
@@ -229,81 +304,92 @@ class PencilModifier(GeneralPlugin):
 		event = notification.object()
 		self.OptionIsHeld = bool(event.modifierFlags() & NSEventModifierFlagOption)
 		self.ShiftIsHeld = bool(event.modifierFlags() & NSEventModifierFlagShift)
+		self.updateShadeIsActive()
 		# Save mouse cursor position in Edit View
-		if self.SETTINGS["ShadeTheArea"]:
-			tab = Glyphs.font.currentTab
+		if self.settingShadeTheArea:
+			tab = font.currentTab
 			view = tab.graphicView() if tab else None
 			event = Glyphs.currentEvent() if view else None
 			if event:
 				self.mousePosition = view.getActiveLocation_(event)
 				self.mousePositionStart = self.mousePosition
+				self.updateShadeIsActive()
+				self.dragView = view
+				self.dragPaths = None
+				self.shadeCacheKey = None
+				self.shadeCachePath = None
 				self.redrawEditView()
 	
 	# Mouse Up event
 	@objc.python_method
 	def handleMouseUp(self, notification):
-		# Clear any possible hanged previous undo grouping and timer
+		# Clear any possible hanged previous undo grouping and delayed path request
 		if self.undoManager is not None:
 			try:
 				self.undoManager.endUndoGrouping()
 			except Exception:
 				pass
 			self.undoManager = None
-		if self.getPathTimer is not None:
+		if self.getPathIsPending:
 			try:
-				self.getPathTimer.invalidate()
+				NSObject.cancelPreviousPerformRequestsWithTarget_(self)
 			except Exception:
 				pass
-			self.getPathTimer = None
+			self.getPathIsPending = False
+		font = Glyphs.font
 		# Check if Pencil tool is active
-		if Glyphs.font.tool not in ("PenTool", "GSToolGroup"):
+		if font.tool not in PENCIL_TOOLS:
 			# Clear current states
 			self.clearStates()
-			if self.SETTINGS["ShadeTheArea"]:
+			if self.settingShadeTheArea:
 				self.redrawEditView()
 			return
 		# Check if processing is required
-		if not (self.SETTINGS["SimplifyPath"] or self.OptionIsHeld or self.ShiftIsHeld):
+		if not (self.settingSimplifyPath or self.OptionIsHeld or self.ShiftIsHeld):
 			return
 		# Begin undo grouping
-		layer = Glyphs.font.selectedLayers[0]
+		layer = font.selectedLayers[0]
 		self.undoManager = layer.undoManager()
 		self.undoManager.beginUndoGrouping()
 		# Get drawn path after delay
+		# Delayed perform is scheduled on the current run loop and canceled by target, so no timer has to be kept
 		userInfo = {"OptionIsHeld": self.OptionIsHeld, "ShiftIsHeld": self.ShiftIsHeld}
-		self.getPathTimer = NSTimer.scheduledTimerWithTimeInterval_target_selector_userInfo_repeats_(
-			self.getPathDelay, self, "getPath:", userInfo, False
-		)
+		self.getPathIsPending = True
+		self.performSelector_withObject_afterDelay_("getPath:", userInfo, self.getPathDelay)
 		# Clear current states (except: PencilIsActive, mousePosition, ShadeTheAreaTimestamp)
 		self.OptionIsLocked = False
 		self.OptionIsHeld = False
 		self.ShiftIsHeld = False
+		self.ShadeIsActive = False
 		self.mousePositionStart = None
 		self.closestPath = None
 		self.closestArea = None
-		if self.SETTINGS["ShadeTheArea"]:
+		self.dragView = None
+		self.dragPaths = None
+		self.shadeCacheKey = None
+		self.shadeCachePath = None
+		if self.settingShadeTheArea:
 			self.redrawEditView()
 	
 	# Get drawn path and process it
-	def getPath_(self, timer):
+	def getPath_(self, flags):
 		# Receive modifier flags
-		flags = timer.userInfo()
 		OptionIsHeld = flags.get("OptionIsHeld", False)
 		ShiftIsHeld = flags.get("ShiftIsHeld", False)
-		# Clear timer
-		timer.invalidate()
-		self.getPathTimer = None
+		# Delayed request is done
+		self.getPathIsPending = False
 		# Process path
-		Glyphs.font.disableUpdateInterface()
+		font = Glyphs.font
+		font.disableUpdateInterface()
 		try:
 			# Get drawn path
-			layer = Glyphs.font.selectedLayers[0]
+			layer = font.selectedLayers[0]
 			paths = [p for p in layer.paths if p.nodes]
 			if len(paths) == 0:
 				return
 			path = paths[-1]
 			# Simplify Path
-			if self.SETTINGS["SimplifyPath"]:
+			if self.settingSimplifyPath:
 				try:
 					simplify_path(path)
 				except Exception as e:
@@ -311,18 +397,28 @@ class PencilModifier(GeneralPlugin):
 			# Redraw Path
 			if OptionIsHeld and len(paths) >= 2:
 				try:
-					redraw_path(layer, paths, path, self.SETTINGS["AdjustConnections"])
+					redraw_path(layer, paths, path, self.settingAdjustConnections)
 				except Exception as e:
 					print("Error in Redraw Path:", e)
 			# Close Drawn Path
 			elif ShiftIsHeld:
 				path.closed = True
-				if self.SETTINGS["CorrectPathDirection"]:
+				if self.settingCorrectPathDirection:
 					layer.correctPathDirection()
 		except Exception as e:
 			print(f"Error in {self.menuName}:", e)
 		finally:
-			Glyphs.font.enableUpdateInterface()
+			font.enableUpdateInterface()
+			# Paths were edited, so paths and segments saved by shade the area searches are outdated
+			# Delayed request can be done after the next mouse down, while the mouse is already dragged
+			self.dragPaths = None
+			clear_segments_cache()
+			# Closest area could be found on paths before editing, so it's searched again on next draw
+			self.closestPath = None
+			self.closestArea = None
+			self.shadeCacheKey = None
+			self.shadeCachePath = None
+			self.ShadeTheAreaTimestamp = 0
 			Glyphs.redraw()
 			# End undo grouping
 			if self.undoManager:
@@ -331,7 +427,7 @@ class PencilModifier(GeneralPlugin):
 					actionName = "Redraw Path"
 				elif ShiftIsHeld:
 					actionName = "Draw Closed Path"
-				elif self.SETTINGS["SimplifyPath"]:
+				elif self.settingSimplifyPath:
 					actionName = "Draw Simplified Path"
 				try:
 					self.undoManager.setActionName_(actionName)
@@ -343,27 +439,91 @@ class PencilModifier(GeneralPlugin):
 	
 	
 	# Force to redraw in Edit View tab
+	# View merges repeated requests into one draw, so marking it again is cheap
 	def redrawEditView(self):
 		font = Glyphs.font
 		if font:
-			tab = Glyphs.font.currentTab
+			tab = font.currentTab
 			if tab:
 				view = tab.graphicView()
 				if view:
 					view.setNeedsDisplay_(True)
 	
+	# Redraw in Edit View tab no more frequently than display refresh (60 times per second by default)
+	# Mouse events could come faster than the view is able to draw them
+	@objc.python_method
+	def redrawEditViewThrottled(self):
+		# Trailing redraw of previous event is replaced by this one
+		NSObject.cancelPreviousPerformRequestsWithTarget_selector_object_(self, "redrawEditView", None)
+		timestamp = time.monotonic()
+		remaining = self.redrawInterval - (timestamp - self.redrawTimestamp)
+		# Event inside the interval is drawn once the interval ends, so the last mouse position is always shaded
+		if remaining > 0:
+			self.performSelector_withObject_afterDelay_("redrawEditView", None, remaining)
+			return
+		self.redrawTimestamp = timestamp
+		self.redrawEditView()
+	
+	# Build Bezier path of the closest area
+	@objc.python_method
+	def buildShadePath(self, nodes, nodes_length, path_is_closed):
+		# Type and position of each node are read from Glyphs once and saved by area index
+		snapshot = {}
+		def read_node(i):
+			if i not in snapshot:
+				# Use modulo only if path is closed
+				node = nodes[i % nodes_length] if path_is_closed else nodes[i]
+				snapshot[i] = (node.type, node.position)
+			return snapshot[i]
+		# Collect on-curve nodes
+		# Filtering reads all area nodes into snapshot, so segments below reuse them
+		oncurve_nodes = [i for i in self.closestArea if read_node(i)[0] != OFFCURVE]
+		if not oncurve_nodes:
+			return None
+		shade_path = NSBezierPath.bezierPath()
+		# Move to first on-curve
+		shade_path.moveToPoint_(read_node(oncurve_nodes[0])[1])
+		# Iterate through on-curve pairs
+		for j in range(1, len(oncurve_nodes)):
+			start_idx = oncurve_nodes[j-1]
+			end_idx   = oncurve_nodes[j]
+			# Number of intermediate nodes between on-curves
+			# Their positions are read directly by index, list is built only for quadratic run
+			handles_count = end_idx - start_idx - 1
+			end_type, end_pos = read_node(end_idx)
+			# Line segment
+			if end_type == LINE:
+				shade_path.lineToPoint_(end_pos)
+			# Cubic segment
+			elif end_type == CURVE:
+				if handles_count == 2:
+					cp1 = read_node(start_idx + 1)[1]
+					cp2 = read_node(start_idx + 2)[1]
+					shade_path.curveToPoint_controlPoint1_controlPoint2_(end_pos, cp1, cp2)
+				else:
+					shade_path.lineToPoint_(end_pos)
+			# Quadratic segment
+			elif end_type == QCURVE:
+				if handles_count <= 0:
+					shade_path.lineToPoint_(end_pos)
+				else:
+					intermediate = [read_node(k)[1] for k in range(start_idx + 1, end_idx)]
+					quadratic_to_cubic(shade_path, read_node(start_idx)[1], intermediate, end_pos)
+			# Broken segment with unknown type
+			else:
+				shade_path.lineToPoint_(end_pos)
+		return shade_path
+	
 	# Shade the closest area on foreground
 	@objc.python_method
 	def drawForeground(self, layer, darkAndScale):
-		if not self.SETTINGS["ShadeTheArea"]:
-			return
-		if not self.PencilIsActive or not self.OptionIsHeld or self.mousePosition is None:
+		if not self.ShadeIsActive:
 			return
 		# --------------------------------------------------
 		# Find closest area
 		# Make request no more frequently than threshold interval (50 milliseconds by default)
 		# Otherwise use previously saved closest area
-		timestamp = time.time()
+		timestamp = time.monotonic()
 		if timestamp - self.ShadeTheAreaTimestamp > self.ShadeTheAreaInterval:
 			self.ShadeTheAreaTimestamp = timestamp
 			mousePosition = self.mousePosition
@@ -371,12 +531,21 @@ class PencilModifier(GeneralPlugin):
 				mousePositionStart = self.mousePositionStart
 			else:
 				mousePositionStart = self.mousePosition
-			layer = Glyphs.font.selectedLayers[0]
-			paths = [p for p in layer.paths if p.nodes]
+			# Paths don't change while the mouse is dragged, except by delayed getPath: request that resets saved paths
+			# So paths and their segments indexed by the first search in a drag are reused until mouse up
+			paths_unchanged = self.mousePositionStart is not None and self.dragPaths is not None
+			if paths_unchanged:
+				paths = self.dragPaths
+			else:
+				# While hovering, paths are collected on every search, checking them for changes would read every path anyway
+				layer = Glyphs.font.selectedLayers[0]
+				paths = [p for p in layer.paths if p.nodes]
+				if self.mousePositionStart is not None:
+					self.dragPaths = paths
 			try:
 				(
 					closest_path, closest_area, CS1, CE1, CS_vector, CE_vector, open_wraparound
-				) = identify_closest_area(paths, None, mousePositionStart, mousePosition)
+				) = identify_closest_area(paths, None, mousePositionStart, mousePosition, paths_unchanged)
 				# Update closest area with received data
 				if closest_path is not None and closest_area is not None:
 					self.closestPath = closest_path
@@ -399,76 +568,25 @@ class PencilModifier(GeneralPlugin):
 		# Normalise reverse order no normal order
 		if ((self.closestArea[0] - self.closestArea[1]) % nodes_length == 1):
 			self.closestArea.reverse()
-		# Collect on-curve nodes (use modulo only if path is closed)
-		if path_is_closed:
-			oncurve_nodes = [i for i in self.closestArea if nodes[i % nodes_length].type != OFFCURVE]
-		else:
-			oncurve_nodes = [i for i in self.closestArea if nodes[i].type != OFFCURVE]
-		if not oncurve_nodes:
+		# Bezier path is rebuilt only when closest area or geometry of closest path changes, otherwise previously built path is stroked again
+		# Geometry is compared by fingerprint saved with path segments, so moved nodes (like after undo or nudge) are drawn at new positions
+		# Path isn't saved anymore if segments were cleared, then Bezier path is rebuilt on every draw until the next search
+		fingerprint = cached_path_fingerprint(self.closestPath)
+		shadeKey = None
+		if fingerprint is not None:
+			shadeKey = (tuple(self.closestArea), path_is_closed, fingerprint)
+		if shadeKey is None or shadeKey != self.shadeCacheKey:
+			self.shadeCacheKey = shadeKey
+			self.shadeCachePath = self.buildShadePath(nodes, nodes_length, path_is_closed)
+		shade_path = self.shadeCachePath
+		if shade_path is None:
 			return
-		shade_path = NSBezierPath.bezierPath()
-		# Move to first on-curve
-		if path_is_closed:
-			shade_path.moveToPoint_(nodes[oncurve_nodes[0] % nodes_length].position)
-		else:
-			shade_path.moveToPoint_(nodes[oncurve_nodes[0]].position)
-		# Iterate through on-curve pairs
-		for j in range(1, len(oncurve_nodes)):
-			start_idx = oncurve_nodes[j-1]
-			end_idx   = oncurve_nodes[j]
-			# Get intermediate nodes
-			if path_is_closed:
-				intermediate = [nodes[k % nodes_length] for k in range(start_idx + 1, end_idx)]
-				end_node = nodes[end_idx % nodes_length]
-			else:
-				intermediate = [nodes[k] for k in range(start_idx + 1, end_idx)]
-				end_node = nodes[end_idx]
-			end_pos  = end_node.position
-			# Line segment
-			if end_node.type == LINE:
-				shade_path.lineToPoint_(end_pos)
-			# Cubic segment
-			elif end_node.type == CURVE:
-				if len(intermediate) == 2:
-					cp1 = intermediate[0].position
-					cp2 = intermediate[1].position
-					shade_path.curveToPoint_controlPoint1_controlPoint2_(end_pos, cp1, cp2)
-				else:
-					shade_path.lineToPoint_(end_pos)
-			# Quadratic segment
-			elif end_node.type == QCURVE:
-				if len(intermediate) == 0:
-					shade_path.lineToPoint_(end_pos)
-				else:
-					def quadratic_to_cubic(P0, Q, P2):
-						C1 = NSPoint(P0.x + 2/3*(Q.x - P0.x), P0.y + 2/3*(Q.y - P0.y))
-						C2 = NSPoint(P2.x + 2/3*(Q.x - P2.x), P2.y + 2/3*(Q.y - P2.y))
-						return C1, C2
-					prev = nodes[start_idx % nodes_length].position
-					handles = [n.position for n in intermediate]
-					for i, cp in enumerate(handles):
-						is_last = (i == len(handles) - 1)
-						if is_last:
-							c1, c2 = quadratic_to_cubic(prev, cp, end_pos)
-							shade_path.curveToPoint_controlPoint1_controlPoint2_(end_pos, c1, c2)
-						else:
-							next_cp = handles[i+1]
-							mid = NSPoint((cp.x + next_cp.x)/2.0, (cp.y + next_cp.y)/2.0)
-							c1, c2 = quadratic_to_cubic(prev, cp, mid)
-							shade_path.curveToPoint_controlPoint1_controlPoint2_(mid, c1, c2)
-							prev = mid
-			# Broken segment with unknown type
-			else:
-				shade_path.lineToPoint_(end_pos)
 		# --------------------------------------------------
 		# Stroke settings
 		strokeWidth = 3 / darkAndScale["Scale"]
-		strokeColor = "#FFFFFF"
-		if darkAndScale["Black"]:
-			strokeColor = "#0d0d0d"
-		strokeOpacity = 0.8
+		strokeColor = self.shadeColorDark if darkAndScale["Black"] else self.shadeColorLight
 		# Set color and stroke
-		NSColor.colorWithString_(strokeColor).colorWithAlphaComponent_(strokeOpacity).set()
+		strokeColor.set()
 		shade_path.setLineWidth_(strokeWidth)
 		shade_path.stroke()
 	